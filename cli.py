@@ -0,0 +1,85 @@
+import argparse
+import importlib
+import sys
+
+
+# One entry point for every script: python cli.py <command> [options]
+# command: (script module, function, help). The script module is only imported when its
+# command runs, so `--help` and the import / tag commands never load matplotlib,
+# networkx or scipy, and no command reads data it does not use.
+COMMANDS = {
+    # zendesk_import.py
+    "import_all_tickets": ("zendesk_import", "import_all_tickets", "import every ticket from the CSV export"),
+    "import_new_tickets": ("zendesk_import", "import_new_tickets", "import tickets changed since the last import"),
+    "import_all_comments": ("zendesk_import", "import_all_comments", "fetch the comment threads still missing"),
+    "import_new_comments": ("zendesk_import", "import_new_comments", "fetch threads with new comments"),
+    "redrive_failed": ("zendesk_import", "redrive_failed", "retry the requests in the dead letter file"),
+    # paginate_tickets.py
+    "paginate_tickets": ("paginate_tickets", "paginate_tickets", "save id, type and tags of every ticket page by page"),
+    # import_comment.py
+    "get_comments": ("import_comment", "get_comments", "save the raw comments of one ticket to data/test_comment.json"),
+    "test_organize_comment": ("import_comment", "test_organize_comment", "organize data/test_comment.json"),
+    # tickets_script.py
+    "migrate_tickets": ("tickets_script", "migrate_tickets", "convert the old all_tickets.json into the ticket store"),
+    "clean_tags": ("tickets_script", "clean_tags", "merge spelling variants of tags"),
+    "sanitize_tags": ("tickets_script", "sanitize_tags", "strip invalid characters from tags"),
+    "seperate_version_tags": ("tickets_script", "seperate_version_tags", "split version numbers off tags"),
+    "maintain_tags": ("tickets_script", "maintain_tags", "clean + sanitize + version split in one pass"),
+    "get_tags": ("tickets_script", "get_tags", "save the sorted list of unique tags"),
+    "create_folders": ("tickets_script", "create_folders", "create the type/tag folder tree"),
+    "split_comments": ("tickets_script", "split_comments", "move embedded comments into the comment store"),
+    "organize_comments": ("tickets_script", "organize_comments", "write every thread as role/visibility/message"),
+    # export_comments.py
+    "export_comments": ("export_comments", "export_comments", "write the threads into the folder tree"),
+    # data_analysis_script.py
+    "summary": ("data_analysis_script", "summary", "print ticket, tag and solve time stats"),
+    "top_tags": ("data_analysis_script", "top_tags", "plot the most frequent tags"),
+    "tag_freq": ("data_analysis_script", "tag_freq", "plot yearly counts of the top tags"),
+    "tag_pairs": ("data_analysis_script", "tag_pairs", "plot the co-occurrence heatmap of the top tags"),
+    "tag_pairs_all": ("data_analysis_script", "tag_pairs_all", "plot the clustered heatmap of every tag"),
+    "tag_network": ("data_analysis_script", "tag_network", "plot the tag co-occurrence network"),
+    "tag_charts": ("data_analysis_script", "tag_charts", "render a monthly chart per top tag"),
+    "serve": ("data_analysis_script", "serve", "answer tag queries over local HTTP from memory"),
+}
+
+# extra options: command: [(flags, argparse options)]
+# workers is positional, as in "python zendesk_import.py import_all_tickets 4"
+WORKER_OPTION = (("workers",), {"type": int, "nargs": "?", "help": "number of concurrent requests / processes"})
+OPTIONS = {
+    "import_all_tickets": [WORKER_OPTION],
+    "import_all_comments": [WORKER_OPTION],
+    "import_new_comments": [WORKER_OPTION],
+    "redrive_failed": [WORKER_OPTION],
+    "get_comments": [(("ticket_id",), {"type": int, "help": "ticket id"})],
+    "maintain_tags": [(("--dry-run",), {"action": "store_true", "help": "only show the changes"})],
+    "export_comments": [
+        WORKER_OPTION,
+        (("--no-hardlinks",), {"dest": "hardlinks", "action": "store_false", "help": "write each thread once"}),
+    ],
+    "serve": [(("--port",), {"type": int, "help": "port on 127.0.0.1 (default 8765)"})],
+    "tag_charts": [(("tag_number",), {"type": int, "nargs": "?", "help": "number of tags (default 100)"})],
+}
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="cli.py", description="Zendesk ticket import, cleanup and analysis")
+    subparsers = parser.add_subparsers(dest="command", metavar="command", required=True)
+    for command, (_, _, help_text) in COMMANDS.items():
+        subparser = subparsers.add_parser(command, help=help_text)
+        for flags, options in OPTIONS.get(command, []):
+            subparser.add_argument(*flags, **options)
+    return parser
+
+
+def main(argv=None):
+    args = vars(build_parser().parse_args(argv))
+    module_name, function_name, _ = COMMANDS[args.pop("command")]
+    # options left unset keep the function's own defaults
+    kwargs = {name: value for name, value in args.items() if value is not None}
+    function = getattr(importlib.import_module(module_name), function_name)
+    return function(**kwargs)
+
+
+# the guard also keeps worker processes (plot renderer, comment exporter) from re-running the command
+if __name__ == "__main__":
+    main(sys.argv[1:])
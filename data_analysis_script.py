@@ -1,21 +1,36 @@
-from modules.data_analysis import DataAnalysis
-from modules.ticket_data import TicketData
 from modules.json_utils import JsonUtils
 import sys
 
 
-ticket_file = "data/all_tickets.json"
+ticket_file = "data/all_tickets.jsonl"
 tag_csv_file = "data/tag_counts.csv"
 ignored_tags_file = "data/ignored_tags.json"
 
-tickets = TicketData(ticket_file)
-ignored_tags = set(JsonUtils.load_json(ignored_tags_file))
-tag_counter = tickets.count_tags(csv_file=tag_csv_file, ignored_tags=ignored_tags)
 
-if sys.argv[1] == "top_tags":
+# One function per command (see cli.py). matplotlib, networkx and scipy are imported
+# inside the plotting commands, so the other commands start without them.
+
+# one scan builds every metric; later runs reuse the cache until the ticket file changes
+def load():
+    from modules.ticket_analytics import TicketAnalytics
+
+    tickets = TicketAnalytics(ticket_file)
+    ignored_tags = set(JsonUtils.load_json(ignored_tags_file))
+    tag_counter = tickets.count_tags(csv_file=tag_csv_file, ignored_tags=ignored_tags)
+    return tickets, ignored_tags, tag_counter
+
+
+def top_tags():
+    from modules.data_analysis import DataAnalysis
+
+    _, _, tag_counter = load()
     DataAnalysis.tags_by_freq(tag_counter, 13,save_figure=True)
 
-if sys.argv[1] == "tag_freq":
+
+def tag_freq():
+    from modules.data_analysis import DataAnalysis
+
+    tickets, _, tag_counter = load()
     tags = [tag for tag, _ in tag_counter.most_common(10)]
 
     index, series = tickets.get_yearly_tag_counts(tags, start_year=2019)
@@ -24,14 +39,80 @@ if sys.argv[1] == "tag_freq":
     # index, series = tickets.get_monthly_tag_counts(tags, months=5)
     # DataAnalysis.tag_trends_line(index, series, str_type="month")
 
-if sys.argv[1] == "tag_pairs":
+
+def tag_pairs():
+    from modules.data_analysis import DataAnalysis
+
+    tickets, _, tag_counter = load()
     tags = [tag for tag, _ in tag_counter.most_common(10)]
     # additional_tags = ["sent_to_github", "jira_escalated", "known_issue", "bug"]
     # tags = tags + additional_tags
     matrix, labels = tickets.build_cooccurrence(tags, ignored_tags=None)
     DataAnalysis.plot_cooccurrence_heatmap(matrix,labels,save_path="tag_pairs_test")
 
-if sys.argv[1] == "tag_network":
+
+# every tag (up to 1000) as a clustered, rasterized heatmap plus zoomable 50-tag tiles
+def tag_pairs_all():
+    from modules.data_analysis import DataAnalysis
+
+    tickets, ignored_tags, _ = load()
+    matrix, labels = tickets.build_cooccurrence(ignored_tags=ignored_tags, as_sparse=True, top_k=1000)
+    DataAnalysis.plot_cooccurrence_heatmap(
+        matrix, labels, save_path="tag_pairs_all", large=True, reorder="hierarchical", tile_size=50, show=False
+    )
+
+
+def tag_network():
+    from modules.data_analysis import DataAnalysis
+
+    tickets, _, tag_counter = load()
     tags = [tag for tag, _ in tag_counter.most_common(10)]
     matrix, labels = tickets.build_cooccurrence(tags, ignored_tags=None)
-    DataAnalysis.plot_tag_network(matrix,labels,tag_counter,show_isolates=False,save_path="tag_network_1")
+    DataAnalysis.plot_tag_network(
+        matrix, labels, tag_counter, show_isolates=False, save_path="tag_network_1",
+        layout_file="plots/tag_network_layout.json"
+    )
+
+
+def summary():
+    tickets, _, _ = load()
+    results = tickets.results
+    print(f"🎫 {results["ticket_count"]} tickets")
+    for ticket_type, count in sorted(results["type_counts"].items(), key=lambda item: -item[1]):
+        top = sorted(results["type_tag_counts"][ticket_type].items(), key=lambda item: -item[1])[:5]
+        print(f"  {ticket_type}: {count} tickets, top tags: {", ".join(tag for tag, _ in top)}")
+    for ticket_type, stats in results["solve_time"].items():
+        if stats["count"]:
+            print(
+                f"⏱️ {ticket_type}: solved {stats["count"]}, mean {stats["mean"]:.1f} days, "
+                f"median {stats["median"]:.0f}, p90 {stats["p90"]:.0f}"
+            )
+
+
+# one monthly trend chart per tag for the top N tags (default 100), rendered headless in parallel;
+# charts whose data did not change since the last run are skipped
+def tag_charts(tag_number=100):
+    from modules.plot_renderer import PlotRenderer
+
+    tickets, _, tag_counter = load()
+    tags = [tag for tag, _ in tag_counter.most_common(tag_number)]
+    index, series = tickets.get_monthly_tag_counts(tags, months=24)
+
+    jobs = [
+        PlotRenderer.job("tag_trends_line", f"tags/{tag}_per_month.png", index, {tag: counts}, str_type="month")
+        for tag, counts in series.items()
+    ]
+    PlotRenderer().render(jobs)
+
+
+# keeps the tickets in memory and answers tag count, trend and co-occurrence queries
+# on http://127.0.0.1:<port> (see AnalyticsServer); picks up imported tickets on its own
+def serve(port=8765):
+    from modules.analytics_server import AnalyticsServer
+    AnalyticsServer(ticket_file, port=port, ignored_tags_file=ignored_tags_file).serve()
+
+
+# python data_analysis_script.py <command>, see cli.py
+if __name__ == "__main__":
+    from cli import main
+    main(sys.argv[1:])
@@ -0,0 +1,33 @@
+import sys
+
+from modules.json_utils import JsonUtils
+
+
+ticket_file = "D:/Desktop/larsa_AI_project/zendesk/data/all_tickets.jsonl"
+comment_file = "D:/Desktop/larsa_AI_project/zendesk/data/comments.jsonl"
+output_base = "D:/Desktop/larsa_AI_project/zendesk/ticket_comments"
+agent_ids_file = "D:/Desktop/larsa_AI_project/zendesk/data/agent_ids.json"
+ignored_tags_file = "D:/Desktop/larsa_AI_project/zendesk/data/ignored_tags.json"
+
+
+# Writes every ticket's organized comment thread into ticket_comments/<type>/<tag>/;
+# run it again to resume or to pick up threads that changed since the last run.
+def export_comments(workers=None, hardlinks=True):
+    from modules.comment_exporter import CommentExporter
+
+    exporter = CommentExporter(
+        ticket_file,
+        comment_file,
+        output_base,
+        agent_ids_file,
+        ignore_tags=JsonUtils.load_json(ignored_tags_file),
+        workers=workers,
+        hardlinks=hardlinks,
+    )
+    exporter.export()
+
+
+# python export_comments.py [workers] [--no-hardlinks], see cli.py
+if __name__ == "__main__":
+    from cli import main
+    main(["export_comments", *sys.argv[1:]])
@@ -0,0 +1,87 @@
+import json
+import os
+import sys
+import tempfile
+import time
+
+from modules.json_utils import JsonUtils, orjson
+
+
+# Compares how fast the ticket list saves and loads in each storage format.
+# python format_benchmark.py [ticket file (.json or .jsonl)] [repeats]
+ticket_file = sys.argv[1] if len(sys.argv) > 1 else "data/all_tickets.jsonl"
+repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+
+def load_tickets(file_path):
+    if file_path.endswith(".jsonl"):
+        return list(JsonUtils.iter_jsonl(file_path))
+    return JsonUtils.load_json(file_path)
+
+
+def stdlib_save(tickets, file_path, indent):
+    with open(file_path, "w", encoding="utf-8") as f:
+        json.dump(tickets, f, indent=indent)
+
+
+def stdlib_load(file_path):
+    with open(file_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# name: (save(tickets, path), load(path))
+formats = {
+    "json indent=2 (stdlib)": (lambda t, p: stdlib_save(t, p, 2), stdlib_load),
+    "json compact (stdlib)": (lambda t, p: stdlib_save(t, p, None), stdlib_load),
+    "jsonl (JsonUtils)": (lambda t, p: JsonUtils.append_jsonl(t, p), lambda p: list(JsonUtils.iter_jsonl(p))),
+    "pickle 5 snapshot": (JsonUtils.save_snapshot, JsonUtils.load_snapshot),
+}
+if orjson is not None:
+    formats["json indent=2 (orjson)"] = (lambda t, p: JsonUtils.save_list_to_json(t, p, indent=2), JsonUtils.load_json)
+    formats["json compact (orjson)"] = (lambda t, p: JsonUtils.save_list_to_json(t, p, indent=None), JsonUtils.load_json)
+
+
+def best_time(function):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+tickets = load_tickets(ticket_file)
+print(f"📦 {len(tickets)} tickets from {ticket_file}, best of {repeats} runs")
+if orjson is None:
+    print("ℹ️ orjson is not installed, JsonUtils uses the json module")
+
+with tempfile.TemporaryDirectory() as tmp_dir:
+    print(f"{'format':<26}{'save (s)':>10}{'load (s)':>10}{'size (MB)':>11}")
+    for name, (save, load) in formats.items():
+        file_path = os.path.join(tmp_dir, "tickets")
+
+        def save_once():
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            save(tickets, file_path)
+
+        save_time, _ = best_time(save_once)
+        load_time, loaded = best_time(lambda: load(file_path))
+        if loaded != tickets:
+            print(f"❌ {name} did not load the same tickets back")
+        size = os.path.getsize(file_path) / 1e6
+        print(f"{name:<26}{save_time:>10.3f}{load_time:>10.3f}{size:>11.1f}")
+
+    # appending a few tickets: the old read + rewrite vs. JsonUtils.append_list_to_json
+    new_items = tickets[:10]
+    file_path = os.path.join(tmp_dir, "append.json")
+    stdlib_save(tickets, file_path, 2)
+
+    def rewrite_append():
+        data = stdlib_load(file_path)
+        data.extend(new_items)
+        stdlib_save(data, file_path, 2)
+
+    rewrite_time, _ = best_time(rewrite_append)
+    append_time, _ = best_time(lambda: JsonUtils.append_list_to_json(new_items, file_path))
+    print(f"append 10 tickets: read + rewrite {rewrite_time:.3f}s, in place {append_time:.5f}s")
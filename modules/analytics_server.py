@@ -0,0 +1,161 @@
+import time
+from datetime import date
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from modules.json_utils import JsonUtils
+from modules.ticket_analytics import TicketAnalytics
+
+
+class AnalyticsServer(HTTPServer):
+    # Keeps a TicketAnalytics (the TicketIndex and summary results) in memory and answers
+    # queries over local HTTP with JSON, so dashboards do not reload the tickets for
+    # every question. Only binds to localhost.
+    #   GET /summary                         ticket, type and solve time stats
+    #   GET /tags?top=20                     tag counts, most frequent first
+    #   GET /trends?tags=a,b&freq=month&start=2024-01-01&end=2025-01-01
+    #   GET /trends?tags=a,b&months=12       (or &start_year=2019 for yearly counts)
+    #   GET /cooccurrence?tags=a,b           (or ?top_k=50, &normalize=jaccard, &min_count=2;
+    #                                         without tags the top_k default is COOCCURRENCE_TOP_K)
+    #   GET /status
+    # Tag lists are comma separated; ignored tags are left out unless ignored=0.
+    # At most every refresh_interval seconds a request first checks the ticket file:
+    # tickets appended by an import are added to the index, other changes reload it
+    # (see TicketAnalytics.refresh).
+    # Requests are handled one at a time, so a refresh never runs during a query.
+    def __init__(self, ticket_file, port=8765, ignored_tags_file=None, refresh_interval=1.0):
+        self.analytics = TicketAnalytics(ticket_file)
+        self.ignored_tags = set(JsonUtils.load_json(ignored_tags_file)) if ignored_tags_file else set()
+        self.refresh_interval = refresh_interval
+        self.checked_at = time.monotonic()
+        self.reloads = 0
+        super().__init__(("127.0.0.1", port), AnalyticsRequestHandler)
+
+
+    def refresh(self):
+        if time.monotonic() - self.checked_at < self.refresh_interval:
+            return
+        if self.analytics.refresh():
+            self.reloads += 1
+            print(f"🔄 Tickets reloaded: {self.analytics.results['ticket_count']} tickets")
+        self.checked_at = time.monotonic()
+
+
+    def serve(self):
+        host, port = self.server_address[:2]
+        print(f"🚀 Serving {self.analytics.file_path} on http://{host}:{port} (Ctrl+C to stop)")
+        try:
+            self.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.server_close()
+
+
+class AnalyticsRequestHandler(BaseHTTPRequestHandler):
+    # the full vocabulary as a dense JSON matrix would be huge
+    COOCCURRENCE_TOP_K = 100
+    ROUTES = {
+        "/summary": "summary",
+        "/tags": "tags",
+        "/trends": "trends",
+        "/cooccurrence": "cooccurrence",
+        "/status": "status",
+    }
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        route = self.ROUTES.get(url.path.rstrip("/") or "/")
+        if route is None:
+            self._send(404, {"error": f"unknown path {url.path}", "paths": list(self.ROUTES)})
+            return
+
+        self.server.refresh()
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        try:
+            self._send(200, getattr(self, route)(params))
+        except (KeyError, ValueError) as e:
+            self._send(400, {"error": str(e)})
+
+
+    def _send(self, status, payload):
+        body = JsonUtils.dumps(payload)
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+    # one line per request would flood the console of a dashboard server
+    def log_message(self, format, *args):
+        pass
+
+
+    def _ignored(self, params):
+        return self.server.ignored_tags if params.get("ignored", "1") != "0" else set()
+
+
+    @staticmethod
+    def _tags(params):
+        if not params.get("tags"):
+            raise ValueError("tags is required, e.g. ?tags=bug,feature_request")
+        return [tag for tag in params["tags"].split(",") if tag]
+
+
+    # checked before the query: requests run one at a time, so a bad date must not reach the index
+    @staticmethod
+    def _date(params, name):
+        if name not in params:
+            return None
+        try:
+            return date.fromisoformat(params[name])
+        except ValueError:
+            raise ValueError(f"{name} must be a date like 2024-01-31, got {params[name]!r}") from None
+
+
+    def summary(self, params):
+        return self.server.analytics.results
+
+
+    def tags(self, params):
+        counter = self.server.analytics.count_tags(ignored_tags=self._ignored(params))
+        top = int(params["top"]) if "top" in params else None
+        return dict(counter.most_common(top))
+
+
+    def trends(self, params):
+        analytics = self.server.analytics
+        tags = self._tags(params)
+        ignored = self._ignored(params)
+        if "months" in params:
+            index, series = analytics.get_monthly_tag_counts(tags, ignored, months=int(params["months"]))
+        elif "start_year" in params:
+            index, series = analytics.get_yearly_tag_counts(tags, ignored, start_year=int(params["start_year"]))
+        else:
+            index, series = analytics.get_tag_counts_by_period(
+                tags, params.get("freq", "month"), self._date(params, "start"), self._date(params, "end"), ignored
+            )
+        return {"index": [period.date().isoformat() for period in index], "series": series}
+
+
+    def cooccurrence(self, params):
+        options = {"normalize": params.get("normalize", "count")}
+        for name in ("top_k", "min_count", "top_edges"):
+            if name in params:
+                options[name] = int(params[name])
+        tags = self._tags(params) if "tags" in params else None
+        if tags is None:
+            options.setdefault("top_k", self.COOCCURRENCE_TOP_K)
+        matrix, labels = self.server.analytics.build_cooccurrence(tags, self._ignored(params), **options)
+        return {"labels": labels, "matrix": matrix}
+
+
+    def status(self, params):
+        analytics = self.server.analytics
+        return {
+            "file": analytics.file_path,
+            "tickets": analytics.results["ticket_count"],
+            "tags": len(analytics.tickets.index.tags),
+            "reloads": self.server.reloads,
+        }
@@ -1,44 +1,104 @@
-import json
 import os
 
 from modules.json_utils import JsonUtils
+from modules.comment_store import CommentStore
 
 class CommentData:
     
-    def __init__(self, file_path):
+    # file_path is either a saved API response ({"comments": [...], ...})
+    # or, together with ticket_id, a CommentStore file holding every thread.
+    # Pass an open store to look up many tickets without reopening it.
+    # A store save appends only this thread; compact=True saves a JSON file without indentation.
+    def __init__(self, file_path, ticket_id=None, store=None, compact=False):
         self.file_path = file_path
+        self.compact = compact
+        self.ticket_id = ticket_id
+        self.store = store
+        if ticket_id is not None and store is None:
+            self.store = CommentStore(file_path)
         self.comments = self.load_comments()
 
     def load_comments(self):
         if not os.path.exists(self.file_path):
             raise FileNotFoundError(f"{self.file_path} not found.")
-        with open(self.file_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        if self.ticket_id is not None:
+            return self.store.get(self.ticket_id) or {"ticket_id": self.ticket_id, "comments": [], "count": 0}
+        return JsonUtils.load_json(self.file_path)
         
     def save(self):
-        JsonUtils.save_list_to_json(self.comments, self.file_path)
+        if self.ticket_id is not None:
+            self.store.add(self.comments)
+            self.store.commit()
+        else:
+            JsonUtils.save_list_to_json(self.comments, self.file_path, indent=None if self.compact else 2)
         print(f"✅ Comments saved to {self.file_path}")
         
     def get_comments(self):
         return self.comments.get("comments", [])
     
-    def organize_comments(self, agent_ids_file):
-        agent_ids_dict = JsonUtils.load_json(agent_ids_file)
-        agent_ids = [id_values for dict in agent_ids_dict for id_values in dict.values()]
-
-        comment_list = self.comments.get_comments()
-        replies = []
-        for comment in comment_list:
-            reply = {
-                "role": "agent" if comment.get("author_id") in agent_ids else "user",
+    # Agent ids per (file, modification time), so every CommentData shares one load
+    _agent_ids = {}
+
+    # agent_ids.json is a list of {"name": id} dicts; returns a frozenset for O(1) lookups
+    @classmethod
+    def load_agent_ids(cls, agent_ids_file):
+        key = (os.path.abspath(agent_ids_file), os.stat(agent_ids_file).st_mtime_ns)
+        if key not in cls._agent_ids:
+            cls._agent_ids[key] = frozenset(
+                id_values for agent in JsonUtils.load_json(agent_ids_file) for id_values in agent.values()
+            )
+        return cls._agent_ids[key]
+
+
+    # One reply per comment: who wrote it, whether it is public, and the text
+    @staticmethod
+    def organize(comments, agent_ids):
+        is_agent = agent_ids.__contains__
+        return [
+            {
+                "role": "agent" if is_agent(comment.get("author_id")) else "user",
                 "visibility": "public" if comment.get("public") == True else "private",
-                "message": comment.get("plain_body")
+                "message": comment.get("plain_body"),
             }
-            replies.append(reply)
-        target_path = ...
-        JsonUtils.save_list_to_json(replies,target_path)
+            for comment in comments
+        ]
+
+
+    # target_path defaults to "<file>_organized.json", or "<ticket id>_organized.json"
+    # next to the comment store for a single thread.
+    def organize_comments(self, agent_ids_file, target_path=None):
+        replies = self.organize(self.get_comments(), self.load_agent_ids(agent_ids_file))
+
+        if target_path is None:
+            if self.ticket_id is not None:
+                target_path = os.path.join(os.path.dirname(self.file_path), f"{self.ticket_id}_organized.json")
+            else:
+                target_path = os.path.splitext(self.file_path)[0] + "_organized.json"
+        JsonUtils.save_list_to_json(replies, target_path)
         print(f"✅ Comments are organized and saved to {target_path}")
+        return replies
 
-    
 
+    # Organizes many threads of a CommentStore (all of them, or the given ticket_ids)
+    # into a JSONL file with one {"ticket_id": ..., "replies": [...]} line per ticket.
+    # Threads are read and written one at a time, so memory stays flat for any number of comments.
+    @classmethod
+    def organize_threads(cls, comment_file, agent_ids_file, target_path, ticket_ids=None):
+        agent_ids = cls.load_agent_ids(agent_ids_file)
+        store = CommentStore(comment_file, readonly=True)
+        if ticket_ids is None:
+            threads = store.iter_records()
+        else:
+            threads = (store.get(ticket_id) for ticket_id in ticket_ids if ticket_id in store)
+
+        tickets = 0
+        comments = 0
+        with open(target_path, "wb") as f:
+            for thread in threads:
+                replies = cls.organize(thread["comments"], agent_ids)
+                f.write(JsonUtils.dumps({"ticket_id": thread["ticket_id"], "replies": replies}) + b"\n")
+                tickets += 1
+                comments += len(replies)
 
+        print(f"✅ Organized {comments} comments of {tickets} tickets into {target_path}")
+        return tickets
@@ -0,0 +1,166 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from modules.comment_data import CommentData
+from modules.comment_store import CommentStore
+from modules.json_utils import JsonUtils
+from modules.ticket_data import TicketData
+from modules.ticket_store import TicketStore
+
+
+# Set in every worker process by _init_worker
+_worker = {}
+
+
+def _init_worker(comment_file, agent_ids, hardlinks):
+    _worker["comments"] = open(comment_file, "rb")
+    _worker["agent_ids"] = agent_ids
+    _worker["hardlinks"] = hardlinks
+    _worker["folders"] = set()
+
+
+# Runs in a worker: reads each thread with one seek, converts it and writes it.
+# jobs: (ticket_id, offset of the thread in the comment file, target folders,
+#        folders of the previous export that no longer get the thread)
+# Returns one manifest record per ticket.
+def _export_batch(jobs):
+    results = []
+    for ticket_id, offset, folders, stale_folders in jobs:
+        _worker["comments"].seek(offset)
+        thread = JsonUtils.loads(_worker["comments"].readline())
+        replies = CommentData.organize(thread["comments"], _worker["agent_ids"])
+
+        for folder in folders:
+            if folder not in _worker["folders"]:
+                os.makedirs(folder, exist_ok=True)
+                _worker["folders"].add(folder)
+
+        # the thread is written once; the other tag folders get hardlinks to it
+        file_name = f"{ticket_id}.json"
+        target = os.path.join(folders[0], file_name)
+        tmp_path = target + ".tmp"
+        JsonUtils.save_list_to_json(replies, tmp_path)
+        os.replace(tmp_path, target)
+
+        if _worker["hardlinks"]:
+            for folder in folders[1:]:
+                link = os.path.join(folder, file_name)
+                if os.path.exists(link):
+                    os.remove(link)
+                try:
+                    os.link(target, link)
+                except OSError:
+                    # the file system has no hardlinks: fall back to a copy
+                    JsonUtils.save_list_to_json(replies, link)
+
+        # the ticket's tags or type changed since the last export
+        for folder in stale_folders:
+            stale = os.path.join(folder, file_name)
+            if os.path.exists(stale):
+                os.remove(stale)
+
+        results.append({
+            "ticket_id": ticket_id,
+            "offset": offset,
+            "file": target,
+            "folders": folders,
+            "comments": len(replies),
+        })
+    return results
+
+
+class CommentExporter:
+    # Fills the type/tag folder tree made by TicketData.create_tag_subfolders with the
+    # organized comment thread of every ticket ("<ticket id>.json", see CommentData.organize).
+    # A thread is written once, into the ticket's first tag folder; its other tag folders
+    # get hardlinks (hardlinks=True) or nothing (hardlinks=False), and either way the
+    # manifest "<output_base>/export_manifest.jsonl" lists every folder of every ticket.
+    # The manifest is also how a run resumes: tickets already in it are skipped unless
+    # their thread changed in the comment store since, or their folders did (new tags or
+    # type); files left in folders the ticket no longer belongs to are removed.
+    # The conversion and writing run in a pool of worker processes. Scripts using this
+    # need an `if __name__ == "__main__":` guard, since Windows starts workers by
+    # importing the main script again.
+    def __init__(self, ticket_file, comment_file, output_base, agent_ids_file,
+                 ignore_tags=None, workers=None, hardlinks=True, batch_size=200):
+        self.ticket_file = ticket_file
+        self.comment_file = comment_file
+        self.output_base = output_base
+        self.agent_ids = CommentData.load_agent_ids(agent_ids_file)
+        self.ignore_tags = set(ignore_tags or [])
+        self.workers = workers or os.cpu_count()
+        self.hardlinks = hardlinks
+        self.batch_size = batch_size
+
+        os.makedirs(output_base, exist_ok=True)
+        self.manifest = TicketStore(
+            os.path.join(output_base, "export_manifest.jsonl"), key="ticket_id", batch_size=batch_size
+        )
+
+
+    def folders_for(self, ticket):
+        type_folder = os.path.join(self.output_base, ticket.get("type", "null") or "null")
+        tags = [tag for tag in dict.fromkeys(ticket.get("tags", []) or []) if tag not in self.ignore_tags]
+        return [os.path.join(type_folder, tag) for tag in tags] or [type_folder]
+
+
+    # Batches of jobs for the tickets that still need exporting
+    def _jobs(self, comments):
+        exported = {}
+        for record in self.manifest.iter_records():
+            exported[record["ticket_id"]] = (record["offset"], record["folders"])
+
+        batch = []
+        tickets = TicketData(self.ticket_file, stream=True, fields=("id", "type", "tags"), readonly=True)
+        for ticket in tickets:
+            offset = comments.offsets.get(ticket["id"])
+            if offset is None:
+                continue
+            folders = self.folders_for(ticket)
+            old_offset, old_folders = exported.get(ticket["id"], (None, []))
+            if old_offset == offset and old_folders == folders:
+                continue
+            written = folders if self.hardlinks else folders[:1]
+            stale_folders = [folder for folder in old_folders if folder not in written]
+            batch.append((ticket["id"], offset, folders, stale_folders))
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+
+    def export(self):
+        # the workers only read the threads committed when the store is opened here,
+        # so an import can keep writing meanwhile
+        comments = CommentStore(self.comment_file, readonly=True)
+        start = time.perf_counter()
+        exported = 0
+        comment_count = 0
+
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.comment_file, self.agent_ids, self.hardlinks),
+        ) as executor:
+            for batch_number, results in enumerate(executor.map(_export_batch, self._jobs(comments)), 1):
+                # every finished batch is committed, so an interrupted run resumes after it
+                self.manifest.append(results)
+                exported += len(results)
+                comment_count += sum(result["comments"] for result in results)
+                if batch_number % 10 == 0:
+                    self._report(exported, comment_count, start)
+
+        self._report(exported, comment_count, start)
+        print(f"✅ Exported {exported} comment threads to {self.output_base}")
+        return exported
+
+
+    @staticmethod
+    def _report(exported, comment_count, start):
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        print(
+            f"⏱️ {exported} threads, {comment_count} comments in {elapsed:.1f}s "
+            f"({exported / elapsed:.0f} threads/s, {comment_count / elapsed:.0f} comments/s)"
+        )
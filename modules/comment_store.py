@@ -0,0 +1,39 @@
+from modules.ticket_store import TicketStore
+
+
+class CommentStore(TicketStore):
+    # Comment threads live here instead of inside the ticket records, one line per ticket:
+    # {"ticket_id": ..., "comments": [...], "count": ...} (the same keys the API returns).
+    # The persisted id -> offset index means one thread is a single seek away and
+    # opening the store never reads comment text.
+    def __init__(self, file_path="data/comments.jsonl", batch_size=100, readonly=False):
+        super().__init__(file_path, key="ticket_id", batch_size=batch_size, index=True, readonly=readonly)
+
+
+    def add_thread(self, ticket_id, comments, count=None):
+        self.add({
+            "ticket_id": ticket_id,
+            "comments": comments,
+            "count": len(comments) if count is None else count,
+        })
+
+
+    def get_thread(self, ticket_id):
+        thread = self.get(ticket_id)
+        return thread["comments"] if thread else []
+
+
+    # Moves the "ticket_comments" embedded by older imports into this store.
+    # Returns the number of tickets that were changed; the caller saves them.
+    def split_from_tickets(self, tickets):
+        moved = 0
+        for ticket in tickets:
+            if "ticket_comments" not in ticket:
+                continue
+            comments = ticket.pop("ticket_comments")
+            # a failed fetch left an empty list behind; leave it for import_new_comments
+            if ticket.get("comment_count") is not None:
+                self.add_thread(ticket["id"], comments, ticket["comment_count"])
+            moved += 1
+        self.commit()
+        return moved
@@ -3,16 +3,36 @@ import matplotlib.dates as mdates
 import matplotlib.patheffects as pe
 from matplotlib.ticker import MaxNLocator
 import math
+import os
 import numpy as np
 import networkx as nx
+from scipy import sparse
+from scipy.cluster.hierarchy import leaves_list, linkage
+from scipy.sparse.csgraph import reverse_cuthill_mckee
+from scipy.sparse.linalg import eigsh
+from scipy.spatial.distance import pdist
+
+from modules.json_utils import JsonUtils
 
 class DataAnalysis:
+    # plot_cooccurrence_heatmap switches to plot_large_heatmap above this many tags
+    LARGE_HEATMAP_TAGS = 100
+
+    # Every plot method takes show=True: show the figure, then close it.
+    # show=False returns the open figure instead (PlotRenderer saves and closes it).
+    @staticmethod
+    def _finish(fig, show):
+        if not show:
+            return fig
+        plt.show()
+        plt.close(fig)
+
 
     @staticmethod
-    def tags_by_freq(tag_count, tag_number, *, save_figure=False):
+    def tags_by_freq(tag_count, tag_number, *, save_figure=False, show=True):
         labels, counts = zip(*tag_count.most_common(tag_number))
 
-        plt.figure(figsize=(8, 5))
+        fig = plt.figure(figsize=(8, 5))
         plt.bar(labels, counts, color="skyblue")
         plt.xticks(rotation=45, ha="right")
         plt.title(f"Top {tag_number} Tags by Frequency")
@@ -21,12 +41,12 @@ class DataAnalysis:
         plt.tight_layout()
         if save_figure:
             plt.savefig(f"plots/top_{tag_number}_tags", dpi=300)
-        plt.show()
+        return DataAnalysis._finish(fig, show)
 
 
     @staticmethod
-    def tag_trends_line(index, series, str_type="month", *, save_figure=False):
-        plt.figure(figsize=(12, 5))
+    def tag_trends_line(index, series, str_type="month", *, save_figure=False, show=True):
+        fig = plt.figure(figsize=(12, 5))
 
         for tag, counts in series.items():
             plt.plot(index, counts, marker="o", label=tag)
@@ -54,11 +74,25 @@ class DataAnalysis:
         plt.tight_layout()  # leave space on the right
         if save_figure:
             plt.savefig(f"plots/top_{len(series)}_tag_frequency_per_{str_type}_for_{len(index)}_{str_type}s", dpi=300)
-        plt.show()
+        return DataAnalysis._finish(fig, show)
     
 
+    # matrix can be a list of lists, a NumPy array or a scipy sparse matrix
+    # (e.g. a normalized one from TagCooccurrence, then pass a matching value_label)
+    # large=None picks plot_large_heatmap for more than LARGE_HEATMAP_TAGS labels;
+    # large_options are passed on to it (reorder, annotate_top, annotate_min, tile_size, ...)
     @staticmethod
-    def plot_cooccurrence_heatmap(matrix, labels, *, save_path="tag_pairs"):
+    def plot_cooccurrence_heatmap(matrix, labels, *, save_path="tag_pairs", value_label="Co-occurrence count",
+                                  show=True, large=None, **large_options):
+        if large is None:
+            large = len(labels) > DataAnalysis.LARGE_HEATMAP_TAGS
+        if large:
+            return DataAnalysis.plot_large_heatmap(
+                matrix, labels, save_path=save_path, value_label=value_label, show=show, **large_options
+            )
+
+        if sparse.issparse(matrix):
+            matrix = matrix.toarray()
         data = np.array(matrix, dtype=float)
 
         # mask the upper triangle (keep diagonal visible)
@@ -70,8 +104,9 @@ class DataAnalysis:
         # default colormap; simple and readable
         im = ax.imshow(data, aspect='equal')
         cbar = fig.colorbar(im, ax=ax)
-        cbar.ax.set_ylabel("Co-occurrence count", rotation=90, va="bottom", labelpad=15)
-        cbar.ax.yaxis.set_major_locator(MaxNLocator(integer=True))
+        cbar.ax.set_ylabel(value_label, rotation=90, va="bottom", labelpad=15)
+        if np.all(data.compressed() == np.round(data.compressed())):
+            cbar.ax.yaxis.set_major_locator(MaxNLocator(integer=True))
 
         # ticks and labels
         ax.set_xticks(range(len(labels)))
@@ -89,7 +124,8 @@ class DataAnalysis:
         for i, j in iterator:
             val = matrix[i][j]
             if val:  # skip zeros to reduce clutter
-                ax.text(j, i, str(val), 
+                text = str(int(val)) if float(val).is_integer() else f"{val:.2f}"
+                ax.text(j, i, text, 
                         ha="center", va="center", 
                         fontsize=9, color="white",
                         path_effects=[pe.withStroke(linewidth=1.5, foreground="black")])
@@ -97,7 +133,208 @@ class DataAnalysis:
         plt.tight_layout()
         if save_path:
             plt.savefig(f"plots/{save_path}", dpi=300)
-        plt.show()
+        return DataAnalysis._finish(fig, show)
+
+
+    # Heatmap for hundreds or thousands of tags. The matrix stays sparse until it is drawn:
+    #   reorder       "hierarchical", "spectral" or "rcm" puts tags that occur together next
+    #                 to each other so clusters show up as blocks (None keeps the label order)
+    #   max_pixels    beyond this many tags per side, cells are summed into blocks
+    #   max_labels    tick labels are only drawn up to this many tags
+    #   annotate_top  write the values of the N strongest pairs (and of every pair >= annotate_min)
+    #   tile_size     also save zoomable tiles of tile_size x tile_size tags to plots/<save_path>_tiles/
+    # The image is rasterized, so the saved figure stays small whatever the number of cells.
+    @staticmethod
+    def plot_large_heatmap(
+        matrix,
+        labels,
+        *,
+        save_path="tag_pairs",
+        value_label="Co-occurrence count",
+        show=True,
+        reorder="hierarchical",
+        max_pixels=2000,
+        max_labels=150,
+        annotate_top=50,
+        annotate_min=None,
+        tile_size=None,
+        ):
+        matrix = sparse.csr_matrix(matrix, dtype=float)
+        labels = list(labels)
+        if reorder:
+            order = DataAnalysis.cluster_order(matrix, reorder)
+            matrix = matrix[order][:, order]
+            labels = [labels[i] for i in order]
+
+        # lower triangle and diagonal, like the small heatmap
+        lower = sparse.tril(matrix).tocsr()
+        lower.eliminate_zeros()
+        tag_number = len(labels)
+        block = max(1, math.ceil(tag_number / max_pixels))
+        image = DataAnalysis._block_sum(lower, block)
+        image = np.ma.array(image, mask=np.triu(np.ones_like(image, dtype=bool), k=1))
+
+        size = min(0.45 * image.shape[0] + 3, 24)
+        fig, ax = plt.subplots(figsize=(size, size))
+        im = ax.imshow(image, aspect="equal", interpolation="nearest", rasterized=True)
+        cbar = fig.colorbar(im, ax=ax, shrink=0.8)
+        cbar.ax.set_ylabel(value_label, rotation=90, va="bottom", labelpad=15)
+
+        if block == 1 and tag_number <= max_labels:
+            font_size = max(3, 9 - tag_number // 30)
+            ax.set_xticks(range(tag_number))
+            ax.set_yticks(range(tag_number))
+            ax.set_xticklabels(labels, rotation=90, fontsize=font_size)
+            ax.set_yticklabels(labels, fontsize=font_size)
+        else:
+            ax.set_xticks([])
+            ax.set_yticks([])
+
+        ax.set_title(f"Tag Pairs ({tag_number} tags)")
+        ax.set_xlabel("Tag")
+        ax.set_ylabel("Tag")
+
+        if block == 1:
+            DataAnalysis._annotate_cells(ax, lower, annotate_top, annotate_min, fontsize=6)
+
+        plt.tight_layout()
+        if save_path:
+            plt.savefig(f"plots/{save_path}", dpi=300)
+            if tile_size:
+                DataAnalysis._save_heatmap_tiles(
+                    lower, labels, tile_size, save_path, value_label, annotate_top, annotate_min
+                )
+        return DataAnalysis._finish(fig, show)
+
+
+    # Writes the values of the annotate_top strongest cells (and of every cell >= annotate_min)
+    # of a sparse matrix: a handful of text artists instead of one per non-zero cell
+    @staticmethod
+    def _annotate_cells(ax, matrix, annotate_top, annotate_min, fontsize):
+        cells = sparse.coo_matrix(matrix)
+        selected = np.zeros(len(cells.data), dtype=bool)
+        if annotate_top and len(cells.data):
+            top = min(annotate_top, len(cells.data))
+            selected[np.argpartition(cells.data, -top)[-top:]] = True
+        if annotate_min is not None:
+            selected |= cells.data >= annotate_min
+        for i, j, val in zip(cells.row[selected], cells.col[selected], cells.data[selected]):
+            text = str(int(val)) if float(val).is_integer() else f"{val:.2f}"
+            ax.text(j, i, text,
+                    ha="center", va="center",
+                    fontsize=fontsize, color="white",
+                    path_effects=[pe.withStroke(linewidth=1, foreground="black")])
+
+
+    # Tag order that groups tags which occur together (for plot_large_heatmap)
+    @staticmethod
+    def cluster_order(matrix, method="hierarchical"):
+        matrix = abs(sparse.csr_matrix(matrix, dtype=float))
+        tag_number = matrix.shape[0]
+        if tag_number < 3:
+            return np.arange(tag_number)
+
+        if method == "hierarchical":
+            # average linkage on the log-scaled co-occurrence profile of every tag
+            profiles = np.log1p(matrix.toarray())
+            return leaves_list(linkage(pdist(profiles), method="average"))
+        if method == "spectral":
+            # sort by the Fiedler vector: second eigenvector of D^-1/2 A D^-1/2
+            degree = np.asarray(matrix.sum(axis=1)).ravel()
+            scale = np.divide(1.0, np.sqrt(degree), out=np.zeros_like(degree), where=degree > 0)
+            normalized = sparse.diags(scale) @ matrix @ sparse.diags(scale)
+            values, vectors = eigsh(normalized, k=2, which="LA")
+            return np.argsort(vectors[:, np.argmin(values)], kind="stable")
+        if method == "rcm":
+            # reverse Cuthill-McKee: cheapest, keeps non-zero cells close to the diagonal
+            return reverse_cuthill_mckee(matrix.tocsr(), symmetric_mode=True)
+        raise ValueError('method must be "hierarchical", "spectral" or "rcm"')
+
+
+    # Sums block x block cells into one, so the image has at most max_pixels per side
+    @staticmethod
+    def _block_sum(matrix, block):
+        if block == 1:
+            return matrix.toarray()
+        tag_number = matrix.shape[0]
+        groups = np.arange(tag_number) // block
+        pool = sparse.csr_matrix(
+            (np.ones(tag_number), (np.arange(tag_number), groups)),
+            shape=(tag_number, groups[-1] + 1),
+        )
+        return (pool.T @ matrix @ pool).toarray()
+
+
+    # Saves the non-empty tiles of the lower triangle as small heatmaps, each annotated
+    # like the full one (annotate_top / annotate_min per tile)
+    @staticmethod
+    def _save_heatmap_tiles(lower, labels, tile_size, save_path, value_label, annotate_top, annotate_min):
+        tile_dir = f"plots/{save_path}_tiles"
+        os.makedirs(tile_dir, exist_ok=True)
+        tag_number = len(labels)
+
+        for row in range(0, tag_number, tile_size):
+            for col in range(0, row + 1, tile_size):
+                tile_cells = lower[row:row + tile_size, col:col + tile_size]
+                if not tile_cells.nnz:
+                    continue
+                tile = tile_cells.toarray()
+                # cells right of the diagonal belong to the hidden upper triangle
+                rows = np.arange(row, row + tile.shape[0])[:, None]
+                cols = np.arange(col, col + tile.shape[1])[None, :]
+                tile = np.ma.array(tile, mask=cols > rows)
+
+                fig, ax = plt.subplots(figsize=(0.45 * tile.shape[1] + 3, 0.45 * tile.shape[0] + 3))
+                im = ax.imshow(tile, aspect="equal", interpolation="nearest")
+                cbar = fig.colorbar(im, ax=ax)
+                cbar.ax.set_ylabel(value_label, rotation=90, va="bottom", labelpad=15)
+                ax.set_xticks(range(tile.shape[1]))
+                ax.set_yticks(range(tile.shape[0]))
+                ax.set_xticklabels(labels[col:col + tile.shape[1]], rotation=45, ha="right")
+                ax.set_yticklabels(labels[row:row + tile.shape[0]])
+
+                DataAnalysis._annotate_cells(ax, tile_cells, annotate_top, annotate_min, fontsize=9)
+
+                ax.set_title(f"Tag Pairs {row}-{row + tile.shape[0] - 1} x {col}-{col + tile.shape[1] - 1}")
+                plt.tight_layout()
+                plt.savefig(f"{tile_dir}/tile_{row}_{col}", dpi=150)
+                plt.close(fig)
+
+
+    # Force-directed positions for G (spring_layout, which switches to its sparse solver
+    # for large graphs). With layout_file the positions are saved and the next call
+    # starts from them: known tags keep their place, new tags start next to their
+    # neighbours, and only a few refinement steps are needed. Without saved positions
+    # the start is a spectral layout, so the result depends on the graph, not on chance.
+    @staticmethod
+    def network_layout(G, *, layout_file=None, seed=53, iterations=50, warm_iterations=15):
+        saved = {}
+        if layout_file and os.path.exists(layout_file):
+            saved = JsonUtils.load_json(layout_file)
+
+        known = [node for node in G if node in saved]
+        if known:
+            rng = np.random.default_rng(seed)
+            start = {node: np.array(saved[node]) for node in known}
+            for node in G:
+                if node in start:
+                    continue
+                neighbours = [start[other] for other in G[node] if other in start]
+                center = np.mean(neighbours, axis=0) if neighbours else np.zeros(2)
+                start[node] = center + rng.normal(scale=0.05, size=2)
+            steps = warm_iterations if len(known) >= 0.9 * len(G) else iterations
+        else:
+            start = None
+            if len(G) >= 3 and G.number_of_edges():
+                start = nx.spectral_layout(G)
+            steps = iterations
+
+        position = nx.spring_layout(G, pos=start, iterations=steps, seed=seed) if len(G) else {}
+
+        if layout_file:
+            saved.update({node: [float(x), float(y)] for node, (x, y) in position.items()})
+            JsonUtils.save_list_to_json(saved, layout_file)
+        return position
 
 
     @staticmethod
@@ -112,28 +349,29 @@ class DataAnalysis:
         node_size_scale=100,        # multiplies sqrt(count)
         edge_scale=1,               # linewidth = 1 + edge_scale * weight
         seed=53,                    # reproducible layout
-        save_path="tag_network"
+        layout_file=None,           # JSON file that keeps node positions between runs
+        save_path="tag_network",
+        show=True
         ):
         
-        tag_number = len(labels)
-        G = nx.Graph()
-
         # nodes
         # make sure every label has a numeric count (default 0)
-        sizes = []
-        for label in labels:
-            count = int(tag_counts.get(label,0))
-            size = base_node_size + node_size_scale * math.sqrt(count)
-            G.add_node(label, count=count, size=size)
-            sizes.append(size)
+        counts = [int(tag_counts.get(label, 0)) for label in labels]
+        G = nx.Graph()
+        G.add_nodes_from(
+            (label, {"count": count, "size": base_node_size + node_size_scale * math.sqrt(count)})
+            for label, count in zip(labels, counts)
+        )
 
         # edges
-        # only lower triangle needed; matrix is symmetric
-        for i in range(tag_number):
-            for j in range(i + 1, tag_number):
-                weight = matrix[i][j]
-                if weight >= min_edge:
-                    G.add_edge(labels[i], labels[j], weight=weight)
+        # only one triangle needed; matrix is symmetric. Added in one call from the
+        # sparse upper triangle instead of a Python loop over every cell.
+        upper = sparse.triu(sparse.coo_matrix(matrix, dtype=float), k=1).tocoo()
+        strong = upper.data >= min_edge
+        G.add_weighted_edges_from(
+            (labels[i], labels[j], float(weight))
+            for i, j, weight in zip(upper.row[strong], upper.col[strong], upper.data[strong])
+        )
 
         # optionally drop isolates
         if not show_isolates:
@@ -141,9 +379,9 @@ class DataAnalysis:
             G.remove_nodes_from(isolates)
 
         # layout & draw
-        position = nx.spring_layout(G, seed=seed)  # force-directed
+        position = DataAnalysis.network_layout(G, layout_file=layout_file, seed=seed)
 
-        plt.figure(figsize=(10, 7))
+        fig = plt.figure(figsize=(10, 7))
         # node sizes from graph data (recompute to align with any isolates removed)
         node_sizes = [G.nodes[tag_number]["size"] for tag_number in G.nodes]
 
@@ -159,4 +397,4 @@ class DataAnalysis:
         plt.tight_layout()
         if save_path:
             plt.savefig(f"plots/{save_path}", dpi=300)
-        plt.show()
+        return DataAnalysis._finish(fig, show)
@@ -0,0 +1,176 @@
+import os
+import threading
+
+from modules.json_utils import JsonUtils
+from modules.ticket_store import TicketStore
+
+
+class JsonArrayStore:
+    # A JSON array file (the "all_tickets.json" format) plus an append-only delta log.
+    # Saving a few changed records appends them to "<file>.delta.jsonl" (a TicketStore)
+    # instead of rewriting the whole array; reading the file applies the log on top
+    # (a logged record replaces the one with the same key, new keys go at the end).
+    # Once the log holds compact_after records it is folded back into the array in a
+    # background thread: the log is first renamed to "<file>.delta.compacting.jsonl",
+    # so new saves go to a fresh log while the old one is merged.
+    # indent=None writes the array without indentation (smaller and faster to write).
+    # snapshot=True keeps a binary copy of the parsed array in "<file>.snapshot.pickle",
+    # used instead of parsing the JSON as long as the array file is unchanged.
+    # readonly=True opens the delta log as a reader (see TicketStore).
+    def __init__(self, file_path, key="id", indent=2, compact_after=1000, snapshot=False, readonly=False):
+        self.file_path = file_path
+        self.delta_path = file_path + ".delta.jsonl"
+        self.compacting_path = file_path + ".delta.compacting.jsonl"
+        self.snapshot_path = file_path + ".snapshot.pickle" if snapshot else None
+        self.key = key
+        self.indent = indent
+        self.compact_after = compact_after
+        self.readonly = readonly
+
+        self.delta = TicketStore(self.delta_path, key=key, readonly=readonly)
+        self._compactor = None
+
+
+    # The files the current data is read from
+    def paths(self):
+        return [
+            path for path in (self.file_path, self.compacting_path, self.delta_path)
+            if os.path.exists(path)
+        ]
+
+
+    # Logged records, oldest log first, so later saves win
+    def _deltas(self):
+        self.wait()
+        deltas = {}
+        if os.path.exists(self.compacting_path):
+            for record in TicketStore(self.compacting_path, key=self.key, readonly=True).iter_records():
+                deltas[record[self.key]] = record
+        for record in self.delta.iter_records():
+            deltas[record[self.key]] = record
+        return deltas
+
+
+    def load(self):
+        deltas = self._deltas()
+        return self._merge(self._load_array(), deltas)
+
+
+    def _load_array(self):
+        if self.snapshot_path is None:
+            return JsonUtils.load_json(self.file_path)
+
+        if os.path.exists(self.snapshot_path):
+            snapshot = JsonUtils.load_snapshot(self.snapshot_path)
+            if snapshot.get("source") == self._source_key():
+                return snapshot["records"]
+
+        records = JsonUtils.load_json(self.file_path)
+        self._save_snapshot(records)
+        return records
+
+
+    def _source_key(self):
+        stat = os.stat(self.file_path)
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+    def _save_snapshot(self, records):
+        JsonUtils.save_snapshot({"source": self._source_key(), "records": records}, self.snapshot_path)
+
+
+    # Same as load(), one record at a time
+    def iter_records(self):
+        deltas = self._deltas()
+        for record in JsonUtils.iter_json_array(self.file_path):
+            yield deltas.pop(record.get(self.key), record)
+        yield from deltas.values()
+
+
+    def _merge(self, records, deltas):
+        if not deltas:
+            return records
+        deltas = dict(deltas)
+        merged = [deltas.pop(record.get(self.key), record) for record in records]
+        merged.extend(deltas.values())
+        return merged
+
+
+    # Appends changed records to the delta log.
+    def append(self, records):
+        self.delta.add_many(records)
+        self.delta.commit()
+        if len(self.delta) >= self.compact_after:
+            self.compact()
+
+
+    # Replaces the array with the given records and empties the delta log.
+    def rewrite(self, records):
+        self._check_writable()
+        self.wait()
+        self._write_array(records)
+        if self.snapshot_path:
+            self._save_snapshot(records)
+        self._remove_log(self.compacting_path)
+        self._remove_log(self.delta_path)
+        self.delta = TicketStore(self.delta_path, key=self.key)
+
+
+    def _check_writable(self):
+        if self.readonly:
+            raise ValueError(f"{self.file_path} is opened readonly")
+
+
+    def _write_array(self, records):
+        tmp_path = self.file_path + ".tmp"
+        JsonUtils.save_list_to_json(records, tmp_path, indent=self.indent)
+        os.replace(tmp_path, self.file_path)
+
+
+    @staticmethod
+    def _remove_log(path):
+        for log_file in (path, path + ".checkpoint"):
+            if os.path.exists(log_file):
+                os.remove(log_file)
+
+
+    # Folds the delta log into the array; with background=True this returns at once.
+    def compact(self, background=True):
+        self._check_writable()
+        self.wait()
+        self.delta.commit()
+        # a log left behind by an interrupted compaction goes first
+        if len(self.delta) and os.path.exists(self.compacting_path):
+            self._compact_log()
+        if len(self.delta):
+            os.replace(self.delta_path, self.compacting_path)
+            self._remove_log(self.delta_path)
+            self.delta = TicketStore(self.delta_path, key=self.key)
+        if not os.path.exists(self.compacting_path):
+            return
+
+        if background:
+            self._compactor = threading.Thread(target=self._compact_log)
+            self._compactor.start()
+        else:
+            self._compact_log()
+
+
+    # Runs on the compaction thread: only touches the array and the renamed log,
+    # never the records held in memory.
+    def _compact_log(self):
+        records = JsonUtils.load_json(self.file_path)
+        deltas = {
+            record[self.key]: record
+            for record in TicketStore(self.compacting_path, key=self.key, readonly=True).iter_records()
+        }
+        self._write_array(self._merge(records, deltas))
+        self._remove_log(self.compacting_path)
+        print(f"🗜️ Compacted {len(deltas)} logged records into {self.file_path}")
+
+
+    # Waits for a running background compaction
+    def wait(self):
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
@@ -1,25 +1,161 @@
+import gc
 import json
+import os
+import pickle
+import re
+from contextlib import contextmanager
+
+# orjson is optional: several times faster than the json module when it is installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 
 class JsonUtils:
+    # All reads and writes go through dumps/loads, which use orjson when it is
+    # available and the json module otherwise. Both produce the same JSON, except
+    # that orjson writes non-ASCII characters as UTF-8 instead of \u escapes.
 
+    # indent is 2 or None (compact, no whitespace); returns UTF-8 bytes
     @staticmethod
-    def save_list_to_json(data_list, file_path):
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(data_list, f, indent=2)
+    def dumps(data, indent=None):
+        if orjson is not None and indent in (None, 2):
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0)
+        separators = (",", ":") if indent is None else None
+        return json.dumps(data, indent=indent, separators=separators).encode("utf-8")
 
 
+    # Parsing a large file creates millions of objects, and the garbage collector would
+    # rescan them again and again while they are being created; loading with it paused
+    # is about twice as fast.
+    @staticmethod
+    @contextmanager
+    def paused_gc():
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            yield
+        finally:
+            if enabled:
+                gc.enable()
+
+
+    @staticmethod
+    def loads(data):
+        if orjson is not None:
+            return orjson.loads(data)
+        return json.loads(data)
+
+
+    # indent=None writes compact JSON without any whitespace
+    @staticmethod
+    def save_list_to_json(data_list, file_path, indent=2):
+        with open(file_path, "wb") as f:
+            f.write(JsonUtils.dumps(data_list, indent=indent))
+
+
+    # Adds items to the end of a JSON array (or a ".jsonl" file) without reading the
+    # file: the closing "]" is overwritten with the new items.
     @staticmethod
     def append_list_to_json(new_items, file_path):
-        with open(file_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+        if not new_items:
+            return
+        if file_path.endswith(".jsonl"):
+            JsonUtils.append_jsonl(new_items, file_path)
+            return
+
+        with open(file_path, "r+b") as f:
+            # find the closing bracket and whatever comes before it
+            end = f.seek(0, os.SEEK_END)
+            tail = b""
+            while end > 0 and len(tail.strip()) < 2:
+                start = max(0, end - 4096)
+                f.seek(start)
+                tail = f.read(end - start) + tail
+                end = start
+            tail = tail.rstrip()
+            if not tail.endswith(b"]"):
+                raise ValueError(f"{file_path} does not end with a JSON array")
+            bracket = end + len(tail) - 1
+            empty = tail[:-1].rstrip().endswith(b"[")
+
+            items = b",\n".join(JsonUtils.dumps(item) for item in new_items)
+            f.seek(bracket)
+            f.write((b"\n" if empty else b",\n") + items + b"\n]")
+            f.truncate()
 
-        data.extend(new_items)
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2)
+
+    # One JSON document per line, appended to the end of the file
+    @staticmethod
+    def append_jsonl(items, file_path):
+        with open(file_path, "ab") as f:
+            f.writelines(JsonUtils.dumps(item) + b"\n" for item in items)
+
+
+    @staticmethod
+    def iter_jsonl(file_path):
+        with open(file_path, "rb") as f:
+            for line in f:
+                if line.strip():
+                    yield JsonUtils.loads(line)
 
 
     @staticmethod
     def load_json(file_path):
-        with open(file_path, "r") as f:
-            return json.load(f)
+        with open(file_path, "rb") as f, JsonUtils.paused_gc():
+            return JsonUtils.loads(f.read())
+
+
+    # Binary snapshot (pickle protocol 5) of already parsed data, e.g. the ticket list;
+    # loading it skips JSON parsing completely. Only load snapshots this program wrote.
+    @staticmethod
+    def save_snapshot(data, file_path):
+        tmp_path = file_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(data, f, protocol=5)
+        os.replace(tmp_path, file_path)
+
+
+    @staticmethod
+    def load_snapshot(file_path):
+        with open(file_path, "rb") as f, JsonUtils.paused_gc():
+            return pickle.load(f)
+
+
+    # Yields the items of a top-level JSON array one at a time, so only one item
+    # (plus one read chunk) is in memory at once.
+    @staticmethod
+    def iter_json_array(file_path, chunk_size=1 << 20):
+        decoder = json.JSONDecoder()
+        separators = re.compile(r"[\s,]*")
+
+        with open(file_path, "r", encoding="utf-8") as f:
+            buffer = f.read(chunk_size).lstrip()
+            if not buffer.startswith("["):
+                raise ValueError(f"{file_path} does not contain a JSON array")
+            pos = 1
+            eof = False
+
+            while True:
+                pos = separators.match(buffer, pos).end()
+                if buffer.startswith("]", pos):
+                    return
+
+                end = None
+                try:
+                    item, end = decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+
+                # the item may continue in the next chunk
+                if end is None or (end == len(buffer) and not eof):
+                    chunk = f.read(chunk_size)
+                    eof = not chunk
+                    buffer = buffer[pos:] + chunk
+                    pos = 0
+                    continue
+
+                yield item
+                pos = end
@@ -0,0 +1,96 @@
+import hashlib
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from modules.json_utils import JsonUtils
+
+
+def _init_worker():
+    # headless: no window, figures are only drawn into files
+    import matplotlib.pyplot as plt
+    plt.switch_backend("Agg")
+
+
+# Runs in a worker: draws one figure with a DataAnalysis method, saves and closes it
+def _render(job, dpi):
+    import matplotlib.pyplot as plt
+    from modules.data_analysis import DataAnalysis
+
+    fig = getattr(DataAnalysis, job["plot"])(*job["args"], **job["kwargs"], show=False)
+    try:
+        fig.savefig(job["output"], dpi=dpi)
+    finally:
+        plt.close(fig)
+    return job["output"]
+
+
+class PlotRenderer:
+    # Renders batches of DataAnalysis plots to files on a pool of worker processes,
+    # using the Agg backend (no windows, nothing blocks).
+    # A job is PlotRenderer.job("tag_trends_line", "tag_x.png", index, series, str_type="month").
+    # The hash of every job's plot method and input data is kept in "<output_dir>/.render_hashes.json";
+    # a job whose output file exists and whose hash is unchanged is skipped.
+    # Scripts using this need an `if __name__ == "__main__":` guard (worker processes on Windows).
+    def __init__(self, output_dir="plots", workers=None, dpi=300):
+        self.output_dir = output_dir
+        self.workers = workers or os.cpu_count()
+        self.dpi = dpi
+        self.hash_file = os.path.join(output_dir, ".render_hashes.json")
+
+
+    # output is relative to output_dir. The method's own saving is switched off,
+    # the renderer saves the figure to output instead.
+    @staticmethod
+    def job(plot, output, *args, **kwargs):
+        if plot in ("tags_by_freq", "tag_trends_line"):
+            kwargs["save_figure"] = False
+        else:
+            kwargs["save_path"] = None
+        return {"plot": plot, "output": output, "args": args, "kwargs": kwargs}
+
+
+    # The plotting code is part of the hash, so changing a plot method redraws its figures
+    @staticmethod
+    def job_hash(job):
+        with open(os.path.join(os.path.dirname(__file__), "data_analysis.py"), "rb") as f:
+            code = f.read()
+        data = pickle.dumps((code, job["plot"], job["args"], sorted(job["kwargs"].items())), protocol=5)
+        return hashlib.sha256(data).hexdigest()
+
+
+    # Renders the jobs that changed; returns the number of figures drawn
+    def render(self, jobs):
+        os.makedirs(self.output_dir, exist_ok=True)
+        hashes = JsonUtils.load_json(self.hash_file) if os.path.exists(self.hash_file) else {}
+
+        todo = []
+        for job in jobs:
+            job = {**job, "output": os.path.join(self.output_dir, job["output"])}
+            job_hash = self.job_hash(job)
+            if hashes.get(job["output"]) == job_hash and os.path.exists(job["output"]):
+                continue
+            os.makedirs(os.path.dirname(job["output"]), exist_ok=True)
+            todo.append((job, job_hash))
+
+        print(f"🎨 Rendering {len(todo)} of {len(jobs)} figures ({len(jobs) - len(todo)} unchanged)")
+        if not todo:
+            return 0
+
+        rendered = 0
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker) as executor:
+            futures = {executor.submit(_render, job, self.dpi): (job, job_hash) for job, job_hash in todo}
+            for future in as_completed(futures):
+                job, job_hash = futures[future]
+                try:
+                    future.result()
+                except Exception as e:
+                    print(f"❌ Failed to render {job['output']}: {e}")
+                    hashes.pop(job["output"], None)
+                    continue
+                hashes[job["output"]] = job_hash
+                rendered += 1
+
+        JsonUtils.save_list_to_json(hashes, self.hash_file)
+        print(f"✅ {rendered} figures saved to {self.output_dir}")
+        return rendered
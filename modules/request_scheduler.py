@@ -0,0 +1,118 @@
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+from modules.json_utils import JsonUtils
+
+
+class RequestScheduler:
+    # Token bucket shared by every worker thread of a ZendeskClient.
+    # The refill rate follows the X-Rate-Limit / X-Rate-Limit-Remaining headers,
+    # a 429 pauses all workers for Retry-After seconds, and requests that still fail
+    # after all retries are kept in a dead-letter file so they can be re-driven later.
+    def __init__(self, rate=5.0, burst=10, min_rate=0.2, base_delay=1, max_delay=60,
+                 dead_letter_file="data/dead_letters.json"):
+        self.rate = rate              # requests per second
+        self.max_rate = rate
+        self.min_rate = min_rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0
+        self.base_delay = base_delay  # seconds
+        self.max_delay = max_delay
+        self.lock = threading.Lock()
+
+        self.dead_letter_file = dead_letter_file
+        self.dead_letters = []
+        if dead_letter_file and os.path.exists(dead_letter_file):
+            self.dead_letters = JsonUtils.load_json(dead_letter_file)
+
+
+    # Blocks until the bucket has a token and no Retry-After pause is active
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+    def pause(self, seconds):
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+
+    # Adapts the refill rate to what Zendesk says is left in the current minute
+    def update(self, headers):
+        limit = headers.get("X-Rate-Limit") or headers.get("ratelimit-limit")
+        remaining = headers.get("X-Rate-Limit-Remaining") or headers.get("ratelimit-remaining")
+        if limit is None or remaining is None:
+            return
+
+        limit, remaining = int(limit), int(remaining)
+        if limit <= 0:
+            return
+
+        with self.lock:
+            self.max_rate = limit / 60
+            # full speed while more than a quarter of the budget is left, then taper off
+            share = min(1.0, remaining / (0.25 * limit))
+            self.rate = max(self.min_rate, self.max_rate * share)
+
+
+    # Seconds to wait before retry number attempt (1-based): exponential with jitter
+    def backoff(self, attempt):
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+
+    @staticmethod
+    def retry_after(headers):
+        value = headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+
+
+    def dead_letter(self, path, error):
+        with self.lock:
+            self.dead_letters.append({"path": path, "error": str(error), "failed_at": time.time()})
+            if self.dead_letter_file:
+                JsonUtils.save_list_to_json(self.dead_letters, self.dead_letter_file)
+
+
+    # Returns the dead-lettered entries ({"path", "error", "failed_at"}) and clears the list;
+    # failures during the re-drive are dead-lettered again. Entries the caller cannot
+    # re-drive go back with put_back_dead_letters.
+    def take_dead_letters(self):
+        with self.lock:
+            entries = self.dead_letters
+            self.dead_letters = []
+            if self.dead_letter_file:
+                JsonUtils.save_list_to_json(self.dead_letters, self.dead_letter_file)
+        return entries
+
+
+    def put_back_dead_letters(self, entries):
+        if not entries:
+            return
+        with self.lock:
+            self.dead_letters.extend(entries)
+            if self.dead_letter_file:
+                JsonUtils.save_list_to_json(self.dead_letters, self.dead_letter_file)
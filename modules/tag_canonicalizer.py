@@ -0,0 +1,72 @@
+from collections import defaultdict
+
+from modules.json_utils import JsonUtils
+
+
+class TagCanonicalizer:
+    # Finds spellings of the same tag and picks one canonical form for each.
+    # Every tag is reduced to a normalized key in one pass (O(T) for T tags), and
+    # tags sharing a key are variants of each other. The rules decide what the key
+    # ignores: underscores, hyphens and/or case. An alias file ({"alias": "tag"})
+    # adds renames no rule can find, e.g. {"ui_bug": "user_interface_bug"}.
+    # By default only variants without separators are renamed ("foobar" -> "foo_bar"), as
+    # clean_tags always did; merge_separated=True also merges two separated spellings
+    # that share a key (e.g. "fo_obar" -> "foo_bar").
+    def __init__(self, underscores=True, hyphens=False, case=False, alias_file=None, merge_separated=False):
+        self.underscores = underscores
+        self.hyphens = hyphens
+        self.case = case
+        self.merge_separated = merge_separated
+        self.aliases = JsonUtils.load_json(alias_file) if alias_file else {}
+
+
+    def key(self, tag):
+        if self.underscores:
+            tag = tag.replace("_", "")
+        if self.hyphens:
+            tag = tag.replace("-", "")
+        if self.case:
+            tag = tag.lower()
+        return tag
+
+
+    @staticmethod
+    def separators(tag):
+        return tag.count("_") + tag.count("-")
+
+
+    # tag_counts: {tag: count}. Returns {tag: canonical tag} for every tag that should be renamed.
+    # Within a group the variant with the most separators wins (so "knownissue" becomes
+    # "known_issue", as clean_tags always did), then lowercase, then the most used one.
+    def build(self, tag_counts):
+        groups = defaultdict(list)
+        for tag in tag_counts:
+            groups[self.key(tag)].append(tag)
+
+        renames = {}
+        for variants in groups.values():
+            if len(variants) < 2:
+                continue
+            canonical = min(
+                variants,
+                key=lambda tag: (
+                    -self.separators(tag),
+                    tag != tag.lower(),
+                    -tag_counts[tag],
+                    tag,
+                ),
+            )
+            for tag in variants:
+                if tag != canonical and (self.merge_separated or not self.separators(tag)):
+                    renames[tag] = canonical
+
+        # aliases win over the rules; follow both until the name stops changing
+        def resolve(tag):
+            seen = set()
+            while tag not in seen:
+                seen.add(tag)
+                tag = self.aliases.get(tag, renames.get(tag, tag))
+            return tag
+
+        final = {tag: resolve(tag) for tag in set(renames) | set(self.aliases)}
+        return {tag: target for tag, target in final.items() if tag != target}
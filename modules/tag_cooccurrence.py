@@ -0,0 +1,97 @@
+import numpy as np
+from scipy import sparse
+
+
+class TagCooccurrence:
+    # Co-occurrence of tags over a TicketIndex, computed as X.T @ X where X is the
+    # binary sparse ticket x tag matrix. Works on the full tag vocabulary; the result
+    # is a sparse symmetric tag x tag matrix with a zero diagonal.
+    NORMALIZATIONS = ("count", "pmi", "lift", "jaccard")
+
+    # tags         explicit label order (tags missing from the data get empty rows)
+    # top_k        otherwise keep the top_k most frequent tags (all tags when None)
+    # normalize    "count" (tickets with both tags), "lift", "pmi" (log of lift) or "jaccard"
+    # min_count    drop pairs seen on fewer tickets than this
+    # top_edges    keep only the top_edges strongest pairs of every tag
+    # Returns (matrix, labels) like TicketData.build_cooccurrence, but matrix is a scipy CSR matrix.
+    @staticmethod
+    def compute(index, tags=None, *, top_k=None, ignored_tags=None, normalize="count",
+                min_count=1, top_edges=None):
+        if normalize not in TagCooccurrence.NORMALIZATIONS:
+            raise ValueError(f"normalize must be one of {TagCooccurrence.NORMALIZATIONS}")
+        ignored = set(ignored_tags or [])
+
+        incidence = sparse.csr_matrix(
+            (np.ones(len(index.indices), dtype=np.int64), index.indices, index.indptr),
+            shape=(len(index), len(index.tags)),
+        )
+        frequency = np.asarray(incidence.sum(axis=0)).ravel()
+
+        if tags is not None:
+            labels = [tag for tag in tags if tag not in ignored]
+        else:
+            order = np.argsort(-frequency, kind="stable")
+            labels = [index.tags[column] for column in order if index.tags[column] not in ignored]
+            if top_k is not None:
+                labels = labels[:top_k]
+
+        # selection matrix: data column -> label position, so missing tags simply stay empty
+        positions = [i for i, tag in enumerate(labels) if tag in index.tag_ids]
+        columns = [index.tag_ids[labels[i]] for i in positions]
+        select = sparse.csr_matrix(
+            (np.ones(len(columns), dtype=np.int64), (columns, positions)),
+            shape=(len(index.tags), len(labels)),
+        )
+        selected = incidence @ select
+
+        counts = (selected.T @ selected).tocsr()
+        tag_frequency = counts.diagonal().astype(float)
+        counts.setdiag(0)
+        counts.eliminate_zeros()
+
+        if min_count > 1:
+            counts.data[counts.data < min_count] = 0
+            counts.eliminate_zeros()
+
+        matrix = counts.tocoo()
+        both = matrix.data.astype(float)
+        freq_a = tag_frequency[matrix.row]
+        freq_b = tag_frequency[matrix.col]
+
+        if normalize == "count":
+            values = matrix.data
+        elif normalize == "jaccard":
+            values = both / (freq_a + freq_b - both)
+        else:
+            lift = both * len(index) / (freq_a * freq_b)
+            values = lift if normalize == "lift" else np.log(lift)
+
+        result = sparse.csr_matrix((values, (matrix.row, matrix.col)), shape=counts.shape)
+
+        if top_edges is not None:
+            result = TagCooccurrence._prune(result, top_edges)
+
+        return result, labels
+
+
+    # Keeps the top_edges largest entries of every row, then mirrors the kept
+    # pairs so the matrix stays symmetric.
+    @staticmethod
+    def _prune(matrix, top_edges):
+        keep_rows = []
+        keep_cols = []
+        for row in range(matrix.shape[0]):
+            start, end = matrix.indptr[row], matrix.indptr[row + 1]
+            if end - start > top_edges:
+                strongest = np.argpartition(matrix.data[start:end], -top_edges)[-top_edges:] + start
+            else:
+                strongest = np.arange(start, end)
+            keep_rows.append(np.full(len(strongest), row))
+            keep_cols.append(matrix.indices[strongest])
+
+        rows = np.concatenate(keep_rows) if keep_rows else np.array([], dtype=np.int64)
+        cols = np.concatenate(keep_cols) if keep_cols else np.array([], dtype=np.int64)
+        mask = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=matrix.shape)
+        mask = mask.maximum(mask.T)
+        mask.data[:] = 1
+        return matrix.multiply(mask.astype(matrix.dtype)).tocsr()
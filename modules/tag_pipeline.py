@@ -0,0 +1,108 @@
+import re
+from collections import Counter
+
+from modules.tag_canonicalizer import TagCanonicalizer
+
+
+class TagPipeline:
+    # A chain of tag transforms that runs over every ticket in one pass:
+    #   clean           merge spelling variants (TagCanonicalizer)
+    #   sanitize        replace characters that are not allowed in folder names
+    #   split_versions  move tags starting with a digit into ticket["version"]
+    # Rename steps (clean, sanitize) are worked out once on the tag vocabulary, so a
+    # ticket costs one dict lookup per tag per step. The methods return self, e.g.
+    #   TagPipeline(tag_counts).clean().sanitize().split_versions()
+    UNSAFE_CHARACTERS = re.compile(r'[\\/:*?"<>|]')
+
+    # vocabulary: {tag: count} of the data the pipeline will run on
+    def __init__(self, vocabulary):
+        self.vocabulary = Counter(vocabulary)
+        self.steps = []
+        self.renames = {}          # all rename steps combined: {original tag: final tag}
+        self.counts = Counter()    # tags changed per step, filled by apply()
+
+
+    def rename(self, renames, name="rename"):
+        self.steps.append((name, renames))
+
+        # the combined map and the vocabulary the next step will see
+        for tag, target in self.renames.items():
+            self.renames[tag] = renames.get(target, target)
+        for tag, target in renames.items():
+            self.renames.setdefault(tag, target)
+        self.renames = {tag: target for tag, target in self.renames.items() if tag != target}
+
+        vocabulary = Counter()
+        for tag, count in self.vocabulary.items():
+            vocabulary[renames.get(tag, tag)] += count
+        self.vocabulary = vocabulary
+        return self
+
+
+    def clean(self, canonicalizer=None):
+        canonicalizer = canonicalizer or TagCanonicalizer()
+        return self.rename(canonicalizer.build(self.vocabulary), "clean")
+
+
+    def sanitize(self):
+        renames = {}
+        for tag in self.vocabulary:
+            clean = self.UNSAFE_CHARACTERS.sub("_", tag)
+            if clean != tag:
+                renames[tag] = clean
+        return self.rename(renames, "sanitize")
+
+
+    def split_versions(self):
+        self.steps.append(("split_versions", None))
+        return self
+
+
+    # True when every step is a rename, so an index can be updated with self.renames
+    @property
+    def renames_only(self):
+        return all(renames is not None for _, renames in self.steps)
+
+
+    # Runs the steps on one ticket. Returns the changed fields ({"tags": [...], "version": ...})
+    # or None when the ticket stays the same; the ticket itself is not modified.
+    def apply(self, ticket):
+        tags = ticket.get("tags", []) or []
+        version = ticket.get("version")
+        has_version = "version" in ticket
+
+        for name, renames in self.steps:
+            if renames is not None:
+                if any(tag in renames for tag in tags):
+                    self.counts[name] += sum(tag in renames for tag in tags)
+                    tags = [renames.get(tag, tag) for tag in tags]
+            elif not has_version:
+                # one filter pass instead of list.remove per version tag
+                version = [tag for tag in tags if tag and tag[0].isdigit()]
+                if version:
+                    tags = [tag for tag in tags if not (tag and tag[0].isdigit())]
+                    self.counts[name] += len(version)
+                else:
+                    version = None
+                has_version = True
+
+        changes = {}
+        if tags != (ticket.get("tags", []) or []):
+            changes["tags"] = tags
+        if has_version and ("version" not in ticket or version != ticket["version"]):
+            changes["version"] = version
+        return changes or None
+
+
+    # One line per changed ticket for dry runs: "#123  tags -old +new  version [...]"
+    @staticmethod
+    def describe(ticket, changes):
+        parts = []
+        if "tags" in changes:
+            before = ticket.get("tags", []) or []
+            removed = [tag for tag in before if tag not in changes["tags"]]
+            added = [tag for tag in changes["tags"] if tag not in before]
+            parts.append("tags " + " ".join([f"-{tag}" for tag in removed] + [f"+{tag}" for tag in added]))
+        if "version" in changes:
+            parts.append(f"version {changes['version']}")
+        return f"#{ticket.get('id')}  " + "  ".join(parts)
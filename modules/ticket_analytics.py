@@ -0,0 +1,160 @@
+import hashlib
+import os
+import pickle
+
+import numpy as np
+
+from modules.ticket_data import TicketData
+
+
+class TicketAnalytics:
+    # Builds everything the analysis commands need in one scan of the ticket file
+    # (the TicketIndex with its tag, date, type and solve-date columns) and keeps it,
+    # plus the summary results derived from it, in a pickle cache next to the data.
+    # The cache is reused as long as the files' size and mtime (and optionally their
+    # sha256) are unchanged, so repeated commands never rescan the tickets: the key only
+    # stats the files, the ticket store is not even opened on a cache hit.
+    FIELDS = ("id", "tags", "date_created", "date_solved", "type")
+    CACHE_VERSION = 3
+
+    def __init__(self, file_path, cache_file=None, verify_hash=False):
+        self.file_path = file_path
+        self.cache_file = cache_file or file_path + ".analytics.pickle"
+        self.verify_hash = verify_hash
+        self._load()
+
+
+    def _load(self):
+        # stream mode: the tickets are only read if the cache is missing or stale.
+        # readonly: this may run next to an import, whose batch in progress must not be cut off
+        self.tickets = TicketData(self.file_path, stream=True, fields=self.FIELDS, readonly=True)
+        self._row_offsets = None
+
+        self.key = self._cache_key()
+        cached = self._read_cache(self.key)
+        if cached is not None:
+            self.tickets._index = cached["index"]
+            self.results = cached["results"]
+        else:
+            self.results = self._aggregate(self.tickets.index)
+            self._write_cache(self.key, {"index": self.tickets.index, "results": self.results})
+            print(f"📊 Analytics cache rebuilt for {self.file_path}")
+
+
+    # Brings the index and results up to date with the ticket file, for a long-running
+    # process (see AnalyticsServer). Tickets appended to a ".jsonl" store since the last
+    # call are added to the index on their own; any other change (a rewritten or compacted
+    # file, a ".json" array) loads it again. Returns True if anything changed.
+    def refresh(self):
+        if not self.file_path.endswith(".jsonl"):
+            if self._cache_key() == self.key:
+                return False
+            self._load()
+            return True
+
+        # a cached index was loaded without the store: open it now, and start over if the
+        # file changed before the store read it
+        opened = self.tickets._store is not None
+        store = self.tickets.store
+        if not opened and self._cache_key() != self.key:
+            self._load()
+            return True
+
+        # row of every ticket in the index = rank of its line in the store
+        if self._row_offsets is None:
+            self._row_offsets = np.sort(np.fromiter(store.offsets.values(), dtype=np.int64, count=len(store)))
+        changes = store.refresh()
+        if changes is None:
+            self._load()
+            return True
+        records, replaced = changes
+        if not records:
+            return False
+
+        removed_rows = np.searchsorted(self._row_offsets, replaced)
+        self.tickets.index.update(records, removed_rows)
+        self._row_offsets = np.concatenate((
+            np.delete(self._row_offsets, removed_rows),
+            np.array([store.offsets[record[store.key]] for record in records], dtype=np.int64),
+        ))
+        self.results = self._aggregate(self.tickets.index)
+
+        # the cache only describes the file if nothing uncommitted follows what was read
+        if os.path.getsize(self.file_path) == store.committed_bytes:
+            self.key = self._cache_key()
+            self._write_cache(self.key, {"index": self.tickets.index, "results": self.results})
+        return True
+
+
+    # Covers every file the tickets are read from (e.g. the delta log of a ".json" file)
+    def _cache_key(self):
+        key = {
+            "version": self.CACHE_VERSION,
+            "path": os.path.abspath(self.file_path),
+            "files": [],
+        }
+        for path in self.tickets.paths():
+            stat = os.stat(path)
+            entry = {"path": path, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+            if self.verify_hash:
+                digest = hashlib.sha256()
+                with open(path, "rb") as f:
+                    for chunk in iter(lambda: f.read(1 << 20), b""):
+                        digest.update(chunk)
+                entry["sha256"] = digest.hexdigest()
+            key["files"].append(entry)
+        return key
+
+
+    def _read_cache(self, key):
+        if not os.path.exists(self.cache_file):
+            return None
+        try:
+            with open(self.cache_file, "rb") as f:
+                cached = pickle.load(f)
+        except (pickle.UnpicklingError, EOFError, AttributeError):
+            return None
+        return cached if cached.get("key") == key else None
+
+
+    def _write_cache(self, key, payload):
+        tmp_path = self.cache_file + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump({"key": key, **payload}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, self.cache_file)
+
+
+    # Summary metrics computed from the index right after the scan
+    @staticmethod
+    def _aggregate(index):
+        return {
+            "ticket_count": len(index),
+            "tag_counts": index.tag_counts(),
+            "type_counts": {
+                ticket_type: int((index.type_codes == code).sum())
+                for code, ticket_type in enumerate(index.types)
+            },
+            "type_tag_counts": index.type_tag_counts(),
+            "solve_time": index.solve_time_stats(),
+        }
+
+
+    # The query methods below answer from the cached index, exactly like TicketData
+    def count_tags(self, csv_file=None, ignored_tags=None):
+        return self.tickets.count_tags(csv_file=csv_file, ignored_tags=ignored_tags)
+
+
+    def get_tag_counts_by_period(self, tags, freq="month", start=None, end=None, ignored_tags=None):
+        return self.tickets.get_tag_counts_by_period(tags, freq, start, end, ignored_tags)
+
+
+    def get_monthly_tag_counts(self, tags, ignored_tags=None, months=12):
+        return self.tickets.get_monthly_tag_counts(tags, ignored_tags=ignored_tags, months=months)
+
+
+    def get_yearly_tag_counts(self, tags, ignored_tags=None, start_year=2017):
+        return self.tickets.get_yearly_tag_counts(tags, ignored_tags=ignored_tags, start_year=start_year)
+
+
+    def build_cooccurrence(self, tags=None, ignored_tags=None, **options):
+        return self.tickets.build_cooccurrence(tags, ignored_tags, **options)
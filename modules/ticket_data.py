@@ -1,41 +1,120 @@
-import json
 import os
-import re
 import csv
-from collections import Counter, defaultdict
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from itertools import combinations
 
+from modules.json_array_store import JsonArrayStore
 from modules.json_utils import JsonUtils
+from modules.tag_pipeline import TagPipeline
+from modules.ticket_index import TicketIndex
+from modules.ticket_store import TicketStore
 
 
 class TicketData:
     # Stores the path to the JSON file in self.file_path
     # Loads the ticket data using self.load_tickets()
     # and stores it in self.tickets
-    def __init__(self, file_path):
+    # A ".jsonl" path is read through TicketStore (the append-only store used by the importer),
+    # a ".json" array through JsonArrayStore (the array plus a delta log of later saves).
+    # With stream=True nothing is loaded up front: iterating the object reads the file
+    # one ticket at a time, keeping only the given fields (e.g. ("id", "tags", "date_created")).
+    # compact=True saves ".json" files without indentation, snapshot=True keeps a binary
+    # copy of a ".json" file next to it that loads several times faster (see JsonArrayStore).
+    # readonly=True is for readers that may run during an import: the store is never
+    # rolled back or written (see TicketStore), and save() raises.
+    # The store is opened on first use, so a stream that is never read costs nothing.
+    def __init__(self, file_path, stream=False, fields=None, compact=False, snapshot=False, readonly=False):
         self.file_path = file_path
-        self.tickets = self.load_tickets()
+        self.compact = compact
+        self.snapshot = snapshot
+        self.readonly = readonly
+        self._store = None
+        self.stream = stream
+        self.fields = fields
+        self.dirty = {}        # id -> ticket changed since the last save, see mark_dirty
+        self.tickets = None if stream else self.load_tickets()
+        self._index = None
+
+
+    @property
+    def store(self):
+        if self._store is None:
+            if self.file_path.endswith(".jsonl"):
+                self._store = TicketStore(self.file_path, readonly=self.readonly)
+            else:
+                self._store = JsonArrayStore(
+                    self.file_path, indent=None if self.compact else 2, snapshot=self.snapshot, readonly=self.readonly
+                )
+        return self._store
+
+
+    # Every file the tickets are read from, checkpoints included, without opening the store
+    def paths(self):
+        if self.file_path.endswith(".jsonl"):
+            data_files = [self.file_path]
+        else:
+            data_files = [self.file_path, self.file_path + ".delta.compacting.jsonl", self.file_path + ".delta.jsonl"]
+        candidates = data_files + [path + ".checkpoint" for path in data_files]
+        return [path for path in candidates if os.path.exists(path)]
+
+
+    # Columnar TicketIndex behind the tag statistics; built on first use and
+    # dropped again by every method that changes tags.
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = TicketIndex(self)
+        return self._index
 
 
     # opens the file at self.file_path (which is the JSON file)
-    # reads and loads the file using json.load(f)
-    # json.load(f) returns the contents of a JSON file into a Python object
-    # The JSON file contains a list of dictionaries, so json.load(f) returns a Python list of dicts
+    # reads and loads the file through self.store (JsonUtils.loads for ".json" files)
+    # The JSON file contains a list of dictionaries, so this returns a Python list of dicts
     # This result is returned by the method and saved as self.tickets in the constructor
     def load_tickets(self):
         if not os.path.exists(self.file_path):
             raise FileNotFoundError(f"{self.file_path} not found.")
-        with open(self.file_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return self.store.load()
 
 
     def __iter__(self):
+        if self.stream:
+            return self.iter_tickets(self.fields)
         return iter(self.tickets)
 
 
+    # Reads tickets lazily from the file, optionally keeping only some fields
+    def iter_tickets(self, fields=None):
+        if not os.path.exists(self.file_path):
+            raise FileNotFoundError(f"{self.file_path} not found.")
+
+        tickets = self.store.iter_records()
+
+        if fields is None:
+            yield from tickets
+        else:
+            for ticket in tickets:
+                yield {field: ticket[field] for field in fields if field in ticket}
+
+
+    # Records tickets as changed, so the next save() only writes those
+    def mark_dirty(self, *tickets):
+        for ticket in tickets:
+            self.dirty[ticket["id"]] = ticket
+
+
+    # Writes only the tickets passed to mark_dirty() when there are any (appended to the
+    # ".jsonl" store or the delta log of a ".json" file), otherwise rewrites the whole file.
     def save(self):
-        JsonUtils.save_list_to_json(self.tickets, self.file_path)
+        if self.dirty:
+            self.store.append(list(self.dirty.values()))
+            print(f"✅ {len(self.dirty)} changed tickets saved to {self.file_path}")
+            self.dirty = {}
+            return
+        if self.stream:
+            raise ValueError("Stream mode has no tickets in memory; use mark_dirty() before save().")
+        self.store.rewrite(self.tickets)
         print(f"✅ Tickets saved to {self.file_path}")
 
 
@@ -45,80 +124,72 @@ class TicketData:
         return max(ticket["id"] for ticket in self.tickets)
     
 
-    def clean_tags(self):
-        known_tags = set()
-        for ticket in self.tickets:
-            known_tags.update(ticket["tags"])
-
-        tag_replacements = {}
-        for tag in list(known_tags):
-            if "_" in tag:
+    # Runs a TagPipeline (see tag_pipeline()) over all tickets in one pass and saves once.
+    # Only tickets the pipeline changes are written (see save), so this also works in
+    # stream mode. dry_run=True only prints what would change.
+    # Returns a list of (ticket, changes) with the ticket as it was before the run.
+    def transform_tags(self, pipeline, dry_run=False):
+        pipeline.counts.clear()
+        changed = []
+        updated = []
+        for ticket in self._writable_tickets():
+            changes = pipeline.apply(ticket)
+            if changes is None:
                 continue
-            for other in known_tags:
-                if "_" in other and other.replace("_", "") == tag:
-                    tag_replacements[tag] = other
-                    break
-
-        modified = 0
-        for ticket in self.tickets:
-            updated = []
-            for tag in ticket["tags"]:
-                if tag in tag_replacements:
-                    updated.append(tag_replacements[tag])
-                    modified += 1
-                else:
-                    updated.append(tag)
-            ticket["tags"] = updated
-
-        print(f"🔧 Cleaned {modified} tags.")
-        self.save()
+            changed.append((ticket if dry_run else dict(ticket), changes))
+            if not dry_run:
+                ticket.update(changes)
+                updated.append(ticket)
+
+        if dry_run:
+            for ticket, changes in changed:
+                print(pipeline.describe(ticket, changes))
+            print(f"🔍 Dry run: {len(changed)} tickets would change.")
+            return changed
+
+        if pipeline.renames_only:
+            self.index.apply_renames(pipeline.renames)
+        else:
+            self._index = None
+        if updated:
+            self.mark_dirty(*updated)
+            self.save()
+        return changed
 
 
-    def sanitize_tags(self):
-        def clean_tag(tag):
-            return re.sub(r'[\\/:*?"<>|]', "_", tag)
-
-        modified = 0
-        for ticket in self.tickets:
-            cleaned_tags = []
-            for tag in ticket.get("tags", []):
-                clean = clean_tag(tag)
-                if clean != tag:
-                    modified += 1
-                cleaned_tags.append(clean)
-            ticket["tags"] = cleaned_tags
-
-        print(f"🧼 Sanitized {modified} tag(s).")
-        self.save()
-        
+    # A TagPipeline for the current tags, e.g. tickets.tag_pipeline().clean().sanitize()
+    def tag_pipeline(self):
+        return TagPipeline(self.index.tag_counts())
 
 
-    def seperate_version_tags(self):
-        modified_count = 0
+    # Merges spelling variants of the same tag ("knownissue" -> "known_issue"), using the
+    # rules of the given TagCanonicalizer (underscores only by default), and returns the
+    # rename map.
+    def clean_tags(self, canonicalizer=None):
+        pipeline = self.tag_pipeline().clean(canonicalizer)
+        self.transform_tags(pipeline)
+        print(f"🔧 Cleaned {pipeline.counts['clean']} tags.")
+        return pipeline.renames
 
-        for ticket in self.tickets:
-            if "version" in ticket:
-                continue
 
-            ticket_tags = ticket.get("tags", [])
-            version = []
+    # Full records to modify: the loaded list, or in stream mode the store's records
+    def _writable_tickets(self):
+        if not self.stream:
+            return self.tickets
+        return self.store.iter_records()
 
-            for ticket_tag in ticket_tags:
 
-                if ticket_tag and ticket_tag[0].isdigit():
-                    version.append(ticket_tag)
+    def sanitize_tags(self):
+        pipeline = self.tag_pipeline().sanitize()
+        self.transform_tags(pipeline)
+        print(f"🧼 Sanitized {pipeline.counts['sanitize']} tag(s).")
 
-            if version:
-                ticket["version"] = version
-                for item in version:
-                    ticket_tags.remove(item)
-                    modified_count += 1
-            else:
-                ticket["version"] = None
 
-        self.save()
+    def seperate_version_tags(self):
+        pipeline = self.tag_pipeline().split_versions()
+        self.transform_tags(pipeline)
         print(
-            f"✅ Version tags extracted from {modified_count} tickets and removed from their tags."
+            f"✅ Version tags extracted from {pipeline.counts['split_versions']} tickets and removed from their tags."
         )
 
 
@@ -126,7 +197,7 @@ class TicketData:
         all_ticket_tags = []
         all_ticket_tags.extend(
             tag 
-            for ticket in self.tickets 
+            for ticket in self 
             for tag in ticket.get("tags", [])
         )
 
@@ -140,14 +211,7 @@ class TicketData:
 
 
     def count_tags(self, csv_file=None, ignored_tags=None):
-        all_ticket_tags = self.get_tags(return_tags=True)
-
-        if ignored_tags:
-            filtered_tags = (tag for tag in all_ticket_tags if tag not in ignored_tags)
-        else:
-            filtered_tags = all_ticket_tags
-
-        tag_counter = Counter(filtered_tags)
+        tag_counter = Counter(self.index.tag_counts(ignored_tags))
 
         if csv_file:
             with open(csv_file, "w", newline="", encoding="utf-8") as file:
@@ -163,124 +227,78 @@ class TicketData:
         if not date_string or date_string.strip() == "\u00a0":
             return None
         
-        for date_format in ("%Y-%m-%d", "%Y-%m-%dT%H:%M:%SZ"):
-            try:
-                return datetime.strptime(date_string, date_format)
-            except ValueError:
-                continue
-        
-        return None
+        # handles both "%Y-%m-%d" and "%Y-%m-%dT%H:%M:%SZ" without trying formats one by one
+        try:
+            return datetime.fromisoformat(date_string).replace(tzinfo=None)
+        except ValueError:
+            return None
 
 
-    def get_monthly_tag_counts(self, tags, ignored_tags=None, months=12):
-        selected_tags = set(tags)
+    # Counts tags per "day", "week", "month", "quarter" or "year" for tickets created
+    # in [start, end) (dates, datetimes or ISO strings; None = open ended).
+    # Runs on the sorted time index of self.index: the window is found by binary search
+    # and all periods are filled in one pass. Returns (index, series) like the methods below.
+    # Raises ValueError for a start or end that is not a date.
+    def get_tag_counts_by_period(self, tags, freq="month", start=None, end=None, ignored_tags=None):
         ignored_tags = set(ignored_tags or [])
+        labels = [tag for tag in dict.fromkeys(tags) if tag not in ignored_tags]
 
-        latest_ticket_date = self._parse_date_safe(self.tickets[-1].get("date_created", ""))
-
-        months_list = []
-        year = latest_ticket_date.year
-        month = latest_ticket_date.month
-
-        month -= 1
-        if month == 0:
-            month = 12
-            year -= 1
-            
-        for _ in range(months):
-            months_list.append((year, month))
-            month -= 1
-            if month == 0:
-                month = 12
-                year -= 1
-        months_list.reverse()  # chronological order
-
-        monthly_counts = defaultdict(int)
+        start_day = self._window_day(start, "start")
+        end_day = self._window_day(end, "end")
+        period_days, counts = self.index.bucket_counts(labels, freq, start_day, end_day)
 
-        valid_months = set(months_list)  # quick lookup
+        index = [TicketIndex.to_datetime(day) for day in period_days]
+        series = {tag: counts[i].tolist() for i, tag in enumerate(labels)}
 
-        min_year, min_month = months_list[0]      # earliest in window
-        max_year, max_month = months_list[-1]     # latest in window
-
-        for ticket in reversed(self.tickets):  # newest first
-            ticket_date = self._parse_date_safe(ticket.get("date_created", ""))
-            if not ticket_date:
-                continue
+        return index, series
 
-            ym = (ticket_date.year, ticket_date.month)
 
-            if ym > (max_year, max_month):
-                continue
+    # Day number of a window bound; MISSING_DAY would make bucket_counts span ~1e17 periods
+    @staticmethod
+    def _window_day(value, name):
+        if value is None:
+            return None
+        day = TicketIndex.day_number(value)
+        if day == TicketIndex.MISSING_DAY:
+            raise ValueError(f"{name} must be a date like 2024-01-31, got {value!r}")
+        return day
 
-            if ym < (min_year, min_month):
-                break
 
-            for tag in ticket.get("tags", []):
-                if tag in selected_tags and tag not in ignored_tags:
-                    monthly_counts[(ym, tag)] += 1
+    # The last `months` full months before the month of the newest ticket
+    def get_monthly_tag_counts(self, tags, ignored_tags=None, months=12):
+        latest_day = self.index.latest_day()
+        if latest_day is None:
+            return [], {tag: [] for tag in tags}
 
-        index = [datetime(y, m, 1) for (y, m) in months_list]
-        series = {
-            tag: [monthly_counts.get(((y, m), tag), 0) for (y, m) in months_list]
-            for tag in selected_tags
-            if tag not in ignored_tags
-        }
+        latest = TicketIndex.to_datetime(latest_day)
+        end = datetime(latest.year, latest.month, 1)
+        first_month = latest.year * 12 + latest.month - 1 - months
+        start = datetime(first_month // 12, first_month % 12 + 1, 1)
 
-        return index, series
+        return self.get_tag_counts_by_period(tags, "month", start, end, ignored_tags)
 
     
+    # Every year from start_year up to the year of the newest ticket
     def get_yearly_tag_counts(self, tags, ignored_tags=None, start_year=2017):
-        selected_tags = set(tags)
-        ignored_tags = set(ignored_tags or [])
-        
-        latest_ticket_date = self._parse_date_safe(self.tickets[-1].get("date_created", ""))
-        if not latest_ticket_date:
+        latest_day = self.index.latest_day()
+        if latest_day is None:
             return [], {tag: [] for tag in tags}
-        
-        years_list = list(range(start_year, latest_ticket_date.year + 1))
-        yearly_counts = defaultdict(int)
-        
-        for ticket in reversed(self.tickets):  # newest → oldest
-            ticket_date = self._parse_date_safe(ticket.get("date_created", ""))
-            if not ticket_date:
-                continue
-
-            year_val = ticket_date.year
-            if year_val < start_year:
-                break  # stop when we go before our window
-
-            for tag in ticket.get("tags", []):
-                if tag in selected_tags and tag not in ignored_tags:
-                    yearly_counts[(year_val, tag)] += 1
-
-        index = [datetime(y, 1, 1) for y in years_list]
-        series = {
-            tag: [yearly_counts.get((y, tag), 0) for y in years_list]
-            for tag in selected_tags
-            if tag not in ignored_tags
-        }
-
-        return index, series
 
+        end = datetime(TicketIndex.to_datetime(latest_day).year + 1, 1, 1)
+        return self.get_tag_counts_by_period(tags, "year", datetime(start_year, 1, 1), end, ignored_tags)
 
-    def build_cooccurrence(self, tags, ignored_tags=None):
-        ignored = set(ignored_tags or [])
-        labels = [t for t in tags if t not in ignored]
 
-        tag_index = {t: i for i, t in enumerate(labels)}
-        n = len(labels)
+    # tags=None uses the whole vocabulary (or the top_k most frequent tags).
+    # as_sparse=True returns the scipy matrix from TagCooccurrence instead of a list of lists;
+    # see TagCooccurrence.compute for normalize, min_count and top_edges.
+    def build_cooccurrence(self, tags=None, ignored_tags=None, *, as_sparse=False, **options):
+        # scipy is only imported by the commands that need the matrix
+        from modules.tag_cooccurrence import TagCooccurrence
 
-        matrix = [[0] * n for _ in range(n)]
+        matrix, labels = TagCooccurrence.compute(self.index, tags, ignored_tags=ignored_tags, **options)
 
-        for ticket in self.tickets:
-            ticket_tags = ticket.get("tags", []) or []
-            present = [t for t in set(ticket_tags) if t in tag_index]
-            if len(present) < 2:
-                continue
-            for a, b in combinations(present, 2):
-                i, j = tag_index[a], tag_index[b]
-                matrix[i][j] += 1
-                matrix[j][i] += 1  # keep symmetric
+        if not as_sparse:
+            matrix = matrix.toarray().tolist()
             
         return matrix, labels
         
@@ -300,31 +318,52 @@ class TicketData:
 
 
 
+
     # self refers to the instance of the class you are calling the method on.
     # "ignore_tags=None" so that we can call this method without needing to pass a second argument
-    def create_tag_subfolders(self, base_dir, ignore_tags=None):
-        # Because None is not iterable
-        # this check ensures ignore_tags is always a list
-        # — either passed by you or defaulting to []
-        if ignore_tags is None:
-            ignore_tags = []
-
-        for ticket in self.tickets:
-            # Uses .get() in case the "type" key does not exist.
-            # If the value is None or "", it still assigns "null" using 'or "null"'
-            ticket_type = ticket.get("type", "null") or "null"
-            ticket_tags = ticket.get("tags", [])
-
-            # the base directory is "D:\Desktop\larsa_AI_project\zendesk\ticket_comments"
-            # folders for all ticket types are created
-            # "exist_ok=True" tells python do not throw an error if this folder already exists.
+    # The unique type/tag folders are collected from the index first, so every folder is
+    # created once no matter how many tickets share it. workers > 1 creates them from a
+    # thread pool (helps on network drives). manifest_file remembers the folders made by
+    # earlier runs, so those are skipped without touching the file system.
+    def create_tag_subfolders(self, base_dir, ignore_tags=None, workers=1, manifest_file=None):
+        type_folders = []
+        tag_folders = []
+        for ticket_type, tag_counts in self.index.type_tag_counts(set(ignore_tags or [])).items():
+            # "null" for tickets without a type, like before
             type_folder = os.path.join(base_dir, ticket_type)
-            os.makedirs(type_folder, exist_ok=True)
+            type_folders.append(type_folder)
+            tag_folders.extend(os.path.join(type_folder, tag) for tag in tag_counts)
+
+        created = set()
+        if manifest_file and os.path.exists(manifest_file):
+            created = set(JsonUtils.load_json(manifest_file))
+        type_folders = [folder for folder in type_folders if folder not in created]
+        tag_folders = [folder for folder in tag_folders if folder not in created]
+        new_folders = type_folders + tag_folders
+
+        # type folders first (few, and the tag folders go inside them), then one mkdir per tag folder
+        for folder in type_folders:
+            os.makedirs(folder, exist_ok=True)
+        if workers > 1:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(self._make_folder, tag_folders))
+        else:
+            for folder in tag_folders:
+                self._make_folder(folder)
+
+        if manifest_file:
+            JsonUtils.save_list_to_json(sorted(created | set(new_folders)), manifest_file)
+
+        print(f"✅ {len(new_folders)} new folders created at: {base_dir}")
 
-            for ticket_tag in ticket_tags:
-                if ticket_tag in ignore_tags:
-                    continue
-                ticket_tag_folder = os.path.join(type_folder, ticket_tag)
-                os.makedirs(ticket_tag_folder, exist_ok=True)
 
-        print(f"✅ Folders created at: {base_dir}")
+    # A single mkdir; "already exists" is fine, a missing parent (removed after the
+    # manifest was written) is created as well
+    @staticmethod
+    def _make_folder(folder):
+        try:
+            os.mkdir(folder)
+        except FileExistsError:
+            pass
+        except FileNotFoundError:
+            os.makedirs(folder, exist_ok=True)
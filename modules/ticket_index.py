@@ -0,0 +1,293 @@
+from datetime import date, datetime
+
+import numpy as np
+
+
+class TicketIndex:
+    # Columnar view of the tickets, built once in a single pass:
+    #   tag_ids / tags  tag string <-> column number
+    #   days            int64 days since 1970-01-01 per ticket (MISSING_DAY if it has no valid date)
+    #   solved_days     the same for date_solved
+    #   type_codes      per ticket position in types (the ticket "type" values, None -> "null")
+    #   indptr/indices  CSR ticket x tag incidence matrix, data holds how often the tag
+    #                   appears on the ticket (normally 1)
+    # On top of that the (ticket, tag) entries are kept sorted by day, so any date window
+    # is a contiguous slice found by binary search.
+    # All the TicketData tag statistics are answered from these arrays with NumPy.
+    MISSING_DAY = np.iinfo(np.int64).min
+    EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+    FREQUENCIES = ("day", "week", "month", "quarter", "year")
+
+    def __init__(self, tickets):
+        self.tag_ids = {}
+        type_ids = {}
+        days = []
+        solved_days = []
+        type_codes = []
+        indptr = [0]
+        indices = []
+        data = []
+        parsed_days = {}   # date strings repeat a lot, parse each one only once
+
+        for ticket in tickets:
+            row = {}
+            for tag in ticket.get("tags", []) or []:
+                column = self.tag_ids.setdefault(tag, len(self.tag_ids))
+                row[column] = row.get(column, 0) + 1
+            indices.extend(row.keys())
+            data.extend(row.values())
+            indptr.append(len(indices))
+
+            for date_field, column_values in (("date_created", days), ("date_solved", solved_days)):
+                date_string = ticket.get(date_field, "")
+                if date_string not in parsed_days:
+                    parsed_days[date_string] = self.day_number(date_string)
+                column_values.append(parsed_days[date_string])
+
+            ticket_type = ticket.get("type", "null") or "null"
+            type_codes.append(type_ids.setdefault(ticket_type, len(type_ids)))
+
+        self.tags = list(self.tag_ids)
+        self.types = list(type_ids)
+        self.days = np.array(days, dtype=np.int64)
+        self.solved_days = np.array(solved_days, dtype=np.int64)
+        self.type_codes = np.array(type_codes, dtype=np.int32)
+        self.indptr = np.array(indptr, dtype=np.int64)
+        self.indices = np.array(indices, dtype=np.int32)
+        self.data = np.array(data, dtype=np.int32)
+        # ticket row of every stored (ticket, tag) entry
+        self.rows = np.repeat(np.arange(len(days), dtype=np.int64), np.diff(self.indptr))
+        self._build_time_index()
+
+
+    # time index: dated entries sorted by day (stable, so ties keep file order)
+    def _build_time_index(self):
+        entry_days = self.days[self.rows]
+        dated = np.flatnonzero(entry_days != self.MISSING_DAY)
+        order = dated[np.argsort(entry_days[dated], kind="stable")]
+        self.entry_days = entry_days[order]
+        self.entry_columns = self.indices[order]
+        self.entry_data = self.data[order]
+        self.sorted_days = np.sort(self.days[self.days != self.MISSING_DAY])
+
+
+    def __len__(self):
+        return len(self.days)
+
+
+    # Applies a {tag: new tag} map (e.g. from TagCanonicalizer) in place, merging
+    # columns that end up with the same name, without going back to the tickets.
+    def apply_renames(self, renames):
+        new_ids = {}
+        column_map = np.array(
+            [new_ids.setdefault(renames.get(tag, tag), len(new_ids)) for tag in self.tags],
+            dtype=np.int64,
+        )
+
+        # (row, new column) pairs; a ticket with two merged variants keeps one entry with their sum
+        keys = self.rows * len(new_ids) + column_map[self.indices]
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        self.data = np.bincount(inverse, weights=self.data).astype(np.int32)
+        self.rows = unique_keys // len(new_ids)
+        self.indices = (unique_keys % len(new_ids)).astype(np.int32)
+        self.indptr = np.concatenate(([0], np.cumsum(np.bincount(self.rows, minlength=len(self)))))
+
+        self.tag_ids = new_ids
+        self.tags = list(new_ids)
+        self._build_time_index()
+
+
+    # Drops the rows removed_rows and appends the given tickets, without going back to the
+    # other tickets (e.g. tickets appended to the ".jsonl" store, where a changed ticket
+    # moves to the end). Tags and types are renumbered in order of first appearance,
+    # so the result is the same as a fresh build over the tickets in that order.
+    def update(self, tickets, removed_rows=()):
+        added = TicketIndex(tickets)
+        keep = np.ones(len(self), dtype=bool)
+        keep[np.asarray(removed_rows, dtype=np.int64)] = False
+        keep_entries = keep[self.rows]
+
+        tag_ids = dict(self.tag_ids)
+        type_ids = {ticket_type: code for code, ticket_type in enumerate(self.types)}
+        tag_map = np.array([tag_ids.setdefault(tag, len(tag_ids)) for tag in added.tags], dtype=np.int64)
+        type_map = np.array([type_ids.setdefault(t, len(type_ids)) for t in added.types], dtype=np.int64)
+        tags, types = list(tag_ids), list(type_ids)
+
+        indices = np.concatenate((self.indices[keep_entries], tag_map[added.indices]))
+        self.data = np.concatenate((self.data[keep_entries], added.data))
+        row_lengths = np.concatenate((np.diff(self.indptr)[keep], np.diff(added.indptr)))
+        self.indptr = np.concatenate(([0], np.cumsum(row_lengths))).astype(np.int64)
+        self.days = np.concatenate((self.days[keep], added.days))
+        self.solved_days = np.concatenate((self.solved_days[keep], added.solved_days))
+        type_codes = np.concatenate((self.type_codes[keep], type_map[added.type_codes]))
+        self.rows = np.repeat(np.arange(len(self.days), dtype=np.int64), row_lengths)
+
+        self.tags, indices = self._first_seen(tags, indices)
+        self.indices = indices.astype(np.int32)
+        self.tag_ids = {tag: column for column, tag in enumerate(self.tags)}
+        self.types, type_codes = self._first_seen(types, type_codes)
+        self.type_codes = type_codes.astype(np.int32)
+        self._build_time_index()
+
+
+    # Keeps the names that occur in codes, numbered by where they first occur
+    @staticmethod
+    def _first_seen(names, codes):
+        used, first = np.unique(codes, return_index=True)
+        order = used[np.argsort(first)]
+        new_codes = np.zeros(len(names), dtype=np.int64)
+        new_codes[order] = np.arange(len(order))
+        return [names[code] for code in order], new_codes[codes]
+
+
+    # Accepts the CSV "YYYY-MM-DD" and API "YYYY-MM-DDTHH:MM:SSZ" strings, date or datetime objects
+    @classmethod
+    def day_number(cls, value):
+        if isinstance(value, (date, datetime)):
+            return value.toordinal() - cls.EPOCH_ORDINAL
+        if not value or value.strip() == "\u00a0":
+            return cls.MISSING_DAY
+        try:
+            return datetime.fromisoformat(value).toordinal() - cls.EPOCH_ORDINAL
+        except ValueError:
+            return cls.MISSING_DAY
+
+
+    @classmethod
+    def to_datetime(cls, day):
+        return datetime.fromordinal(int(day) + cls.EPOCH_ORDINAL)
+
+
+    # Column numbers of the given tags that exist in the index, and their position in tags
+    def _columns(self, tags):
+        positions = [i for i, tag in enumerate(tags) if tag in self.tag_ids]
+        columns = np.array([self.tag_ids[tags[i]] for i in positions], dtype=np.int64)
+        return columns, np.array(positions, dtype=np.int64)
+
+
+    def tag_counts(self, ignored_tags=None):
+        counts = np.bincount(self.indices, weights=self.data, minlength=len(self.tags)).astype(np.int64)
+        ignored = ignored_tags or ()
+        return {
+            tag: int(count)
+            for tag, count in zip(self.tags, counts)
+            if count and tag not in ignored
+        }
+
+
+    # Period number of every day; weeks start on Monday (1970-01-01 was a Thursday)
+    # and months, quarters and years are counted from 1970.
+    @classmethod
+    def period_of(cls, days, freq):
+        days = np.asarray(days, dtype=np.int64)
+        if freq == "day":
+            return days
+        if freq == "week":
+            return (days + 3) // 7
+        months = days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        if freq == "month":
+            return months
+        if freq == "quarter":
+            return months // 3
+        if freq == "year":
+            return months // 12
+        raise ValueError(f"freq must be one of {cls.FREQUENCIES}")
+
+
+    # First day of a period number
+    @classmethod
+    def period_start(cls, period, freq):
+        if freq == "day":
+            return int(period)
+        if freq == "week":
+            return int(period) * 7 - 3
+        months = {"month": 1, "quarter": 3, "year": 12}[freq] * int(period)
+        return int(np.datetime64(months, "M").astype("datetime64[D]").astype(np.int64))
+
+
+    # Indices (into sorted_days) of the tickets created in [start, end)
+    def window(self, start=None, end=None):
+        lo = 0 if start is None else np.searchsorted(self.sorted_days, start, side="left")
+        hi = len(self.sorted_days) if end is None else np.searchsorted(self.sorted_days, end, side="left")
+        return int(lo), int(hi)
+
+
+    # Counts the given tags per day/week/month/quarter/year for tickets created in [start, end)
+    # (day numbers, None = open ended) in one pass over that slice of the time index.
+    # Returns (period start days, counts) with counts shaped (len(tags), number of periods);
+    # periods without tickets are included with zero counts.
+    def bucket_counts(self, tags, freq="month", start=None, end=None):
+        if start is None:
+            start = int(self.sorted_days[0]) if len(self.sorted_days) else 0
+        if end is None:
+            end = int(self.sorted_days[-1]) + 1 if len(self.sorted_days) else 0
+        if end <= start:
+            return [], np.zeros((len(tags), 0), dtype=np.int64)
+
+        first, last = self.period_of([start, end - 1], freq)
+        period_days = [self.period_start(period, freq) for period in range(first, last + 1)]
+        counts = np.zeros((len(tags), len(period_days)), dtype=np.int64)
+
+        columns, positions = self._columns(tags)
+        if not len(columns):
+            return period_days, counts
+
+        lo = np.searchsorted(self.entry_days, start, side="left")
+        hi = np.searchsorted(self.entry_days, end, side="left")
+
+        # map tag column -> row in counts, -1 for tags we do not count
+        column_to_row = np.full(len(self.tags), -1, dtype=np.int64)
+        column_to_row[columns] = positions
+        series_rows = column_to_row[self.entry_columns[lo:hi]]
+        keep = series_rows >= 0
+
+        slots = self.period_of(self.entry_days[lo:hi][keep], freq) - first
+        np.add.at(counts, (series_rows[keep], slots), self.entry_data[lo:hi][keep])
+        return period_days, counts
+
+
+    def latest_day(self):
+        return int(self.sorted_days[-1]) if len(self.sorted_days) else None
+
+
+    # Tag counts per ticket type: {type: {tag: count}}
+    def type_tag_counts(self, ignored_tags=None):
+        ignored = ignored_tags or ()
+        keys = self.type_codes[self.rows].astype(np.int64) * len(self.tags) + self.indices
+        counts = np.bincount(keys, weights=self.data, minlength=len(self.types) * len(self.tags))
+        counts = counts.astype(np.int64).reshape(len(self.types), len(self.tags))
+
+        breakdown = {}
+        for code, ticket_type in enumerate(self.types):
+            columns = np.flatnonzero(counts[code])
+            breakdown[ticket_type] = {
+                self.tags[column]: int(counts[code, column])
+                for column in columns
+                if self.tags[column] not in ignored
+            }
+        return breakdown
+
+
+    # Days from creation to solve, overall ("all") and per ticket type
+    def solve_time_stats(self):
+        solved = (self.days != self.MISSING_DAY) & (self.solved_days != self.MISSING_DAY)
+        durations = self.solved_days - self.days
+        solved &= durations >= 0
+
+        groups = {"all": solved}
+        for code, ticket_type in enumerate(self.types):
+            groups[ticket_type] = solved & (self.type_codes == code)
+
+        stats = {}
+        for name, mask in groups.items():
+            values = durations[mask]
+            if not len(values):
+                stats[name] = {"count": 0, "mean": None, "median": None, "p90": None}
+                continue
+            stats[name] = {
+                "count": int(len(values)),
+                "mean": float(values.mean()),
+                "median": float(np.median(values)),
+                "p90": float(np.percentile(values, 90)),
+            }
+        return stats
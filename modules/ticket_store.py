@@ -0,0 +1,357 @@
+import json
+import os
+
+from modules.json_utils import JsonUtils
+
+
+class TicketStore:
+    # Append-only JSONL store for ticket records.
+    # Every record is one line; a later line with the same key replaces an earlier one.
+    # A checkpoint file next to the data file records how many bytes are committed,
+    # so a crash in the middle of a write is rolled back the next time the store is opened.
+    # With index=True the key -> offset map is also kept in an append-only ".idx" file,
+    # so opening a store of large records (e.g. comment threads) does not parse every line.
+    # delete(key) appends a tombstone line ({key: ..., "deleted": true}) that removes the
+    # record: get, iter_records and load skip it, and compaction drops both lines.
+    # readonly=True is for readers while another process may be writing (an import):
+    # they stop at the checkpoint and never truncate or rewrite the files, since the bytes
+    # after it may be the writer's batch in progress. Only the writer rolls them back.
+    TOMBSTONE = "deleted"
+
+    def __init__(self, file_path, key="id", batch_size=500, compact_ratio=0.5, index=False, readonly=False):
+        self.file_path = file_path
+        self.readonly = readonly
+        self.checkpoint_path = file_path + ".checkpoint"
+        self.index_path = file_path + ".idx" if index else None
+        self.key = key
+        self.batch_size = batch_size
+        self.compact_ratio = compact_ratio
+
+        self.pending = []
+        self.offsets = {}       # key -> byte offset of the latest line for that key
+        self.line_count = 0
+        self.committed_bytes = 0
+        self.index_bytes = 0
+        self.last_id = None
+        self.state = {}         # free-form resume state saved with each checkpoint
+
+        self._recover()
+        self.file_id = self._file_id()
+
+
+    # The files the current data is read from
+    def paths(self):
+        return [self.file_path] if os.path.exists(self.file_path) else []
+
+
+    # Identifies the file itself: a rewrite or compaction replaces it with a new one
+    def _file_id(self):
+        if not os.path.exists(self.file_path):
+            return None
+        stat = os.stat(self.file_path)
+        return stat.st_dev, stat.st_ino
+
+
+    # Points the record's key at its line, or forgets the key for a tombstone
+    def _index_record(self, record, offset):
+        if record.get(self.TOMBSTONE):
+            self.offsets.pop(record[self.key], None)
+        else:
+            self.offsets[record[self.key]] = offset
+
+
+    def __len__(self):
+        return len(self.offsets)
+
+
+    def __contains__(self, key):
+        return key in self.offsets
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        self.commit()
+
+
+    # Reads the checkpoint, drops any bytes written after it and indexes the committed lines.
+    def _recover(self):
+        checkpoint = None
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                checkpoint = json.load(f)
+            self.last_id = checkpoint.get("last_id")
+            self.state = checkpoint.get("state", {})
+
+        if not os.path.exists(self.file_path):
+            return
+
+        size = os.path.getsize(self.file_path)
+        committed = checkpoint["committed_bytes"] if checkpoint else size
+
+        if self.index_path and checkpoint and checkpoint.get("index_bytes") and os.path.exists(self.index_path):
+            self._recover_from_index(checkpoint, size)
+            return
+
+        offset = 0
+        with open(self.file_path, "rb") as f:
+            for line in f:
+                # a line past the checkpoint or without its newline was never committed
+                if offset + len(line) > committed or not line.endswith(b"\n"):
+                    break
+                self._index_record(JsonUtils.loads(line), offset)
+                self.line_count += 1
+                offset += len(line)
+
+        self.committed_bytes = offset
+        if self.readonly:
+            return
+
+        if offset < size:
+            with open(self.file_path, "r+b") as f:
+                f.truncate(offset)
+            print(f"⚠️ Discarded {size - offset} uncommitted bytes from {self.file_path}")
+
+        if self.index_path:
+            self._write_index()
+            self._write_checkpoint()
+
+
+    # Same as the scan above, but reads the small index file instead of the data file.
+    def _recover_from_index(self, checkpoint, size):
+        self.committed_bytes = checkpoint["committed_bytes"]
+        self.index_bytes = checkpoint.get("index_bytes", 0)
+
+        with open(self.index_path, "rb") as f:
+            for line in f.read(self.index_bytes).splitlines():
+                key, offset = JsonUtils.loads(line)
+                if offset is None:
+                    self.offsets.pop(key, None)
+                else:
+                    self.offsets[key] = offset
+                self.line_count += 1
+
+        if self.readonly:
+            return
+        for path, committed in ((self.file_path, self.committed_bytes), (self.index_path, self.index_bytes)):
+            if os.path.getsize(path) > committed:
+                with open(path, "r+b") as f:
+                    f.truncate(committed)
+                print(f"⚠️ Discarded uncommitted bytes from {path}")
+
+
+    def _write_index(self):
+        with open(self.index_path, "wb") as f:
+            for key, offset in self.offsets.items():
+                f.write(JsonUtils.dumps([key, offset]) + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+            self.index_bytes = f.tell()
+
+
+    def _write_checkpoint(self):
+        checkpoint = {
+            "committed_bytes": self.committed_bytes,
+            "index_bytes": self.index_bytes,
+            "last_id": self.last_id,
+            "state": self.state,
+        }
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+
+
+    def add(self, record):
+        self.pending.append(record)
+        if len(self.pending) >= self.batch_size:
+            self.commit()
+
+
+    # Removes a record with a tombstone line (written with the next commit)
+    def delete(self, key):
+        self.add({self.key: key, self.TOMBSTONE: True})
+
+
+    def add_many(self, records):
+        for record in records:
+            self.add(record)
+
+
+    # add_many() + commit()
+    def append(self, records):
+        self.add_many(records)
+        self.commit()
+
+
+    def _check_writable(self):
+        if self.readonly:
+            raise ValueError(f"{self.file_path} is opened readonly")
+
+
+    # Appends the pending batch, fsyncs it and then moves the checkpoint forward.
+    # state (optional) is stored with the checkpoint, e.g. a pagination cursor.
+    def commit(self, state=None):
+        if state is not None:
+            self.state = state
+        if not self.pending and state is None:
+            return
+        self._check_writable()
+
+        offset = self.committed_bytes
+        index_lines = []
+        with open(self.file_path, "ab") as f:
+            for record in self.pending:
+                line = JsonUtils.dumps(record) + b"\n"
+                f.write(line)
+                self._index_record(record, offset)
+                index_offset = None if record.get(self.TOMBSTONE) else offset
+                index_lines.append(JsonUtils.dumps([record[self.key], index_offset]) + b"\n")
+                self.line_count += 1
+                offset += len(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+        if self.index_path and index_lines:
+            with open(self.index_path, "ab") as f:
+                f.writelines(index_lines)
+                f.flush()
+                os.fsync(f.fileno())
+                self.index_bytes = f.tell()
+
+        if self.pending:
+            self.last_id = self.pending[-1][self.key]
+        self.committed_bytes = offset
+        self.pending = []
+        self._write_checkpoint()
+
+        if self.line_count > 1000 and self.line_count - len(self.offsets) > self.compact_ratio * self.line_count:
+            self.compact()
+
+
+    # For a reader while another process writes the store (e.g. a running import):
+    # indexes the lines committed since this store was opened or last refreshed, without
+    # truncating anything. Returns the new records (one per key, in file order) and the
+    # offsets of the older lines they replace, or None if the file was replaced or shrank
+    # since (rewrite, compaction) and the store has to be opened again.
+    def refresh(self):
+        file_id = self._file_id()
+        if file_id is None:
+            return None if self.file_id else ([], [])
+        if self.file_id is not None and file_id != self.file_id:
+            return None
+
+        committed = os.path.getsize(self.file_path)
+        if os.path.exists(self.checkpoint_path):
+            try:
+                with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                    committed = min(committed, json.load(f)["committed_bytes"])
+            except (ValueError, KeyError, OSError):
+                pass   # the writer is replacing it right now, the size check below is enough
+        if committed < self.committed_bytes:
+            return None
+
+        start = self.committed_bytes
+        offset = start
+        records = {}
+        replaced = []
+        with open(self.file_path, "rb") as f:
+            f.seek(start)
+            for line in f:
+                if offset + len(line) > committed or not line.endswith(b"\n"):
+                    break
+                record = JsonUtils.loads(line)
+                key = record[self.key]
+                if self.offsets.get(key, start) < start:
+                    replaced.append(self.offsets[key])
+                self._index_record(record, offset)
+                records.pop(key, None)
+                if not record.get(self.TOMBSTONE):
+                    records[key] = record
+                self.line_count += 1
+                offset += len(line)
+
+        self.file_id = file_id
+        self.committed_bytes = offset
+        return list(records.values()), replaced
+
+
+    # Reads the latest committed version of one record with a single seek.
+    def get(self, key):
+        offset = self.offsets.get(key)
+        if offset is None:
+            return None
+        with open(self.file_path, "rb") as f:
+            f.seek(offset)
+            return JsonUtils.loads(f.readline())
+
+
+    # Yields the latest version of every committed record, one line at a time.
+    def iter_records(self):
+        if not os.path.exists(self.file_path):
+            return
+        offset = 0
+        with open(self.file_path, "rb") as f:
+            for line in f:
+                if offset >= self.committed_bytes:
+                    break
+                record = JsonUtils.loads(line)
+                if self.offsets.get(record[self.key]) == offset:
+                    yield record
+                offset += len(line)
+
+
+    # Returns all records in the order their keys were first written.
+    def load(self):
+        if not os.path.exists(self.file_path):
+            return []
+        records = {}
+        offset = 0
+        with open(self.file_path, "rb") as f, JsonUtils.paused_gc():
+            for line in f:
+                if offset >= self.committed_bytes:
+                    break
+                record = JsonUtils.loads(line)
+                if record.get(self.TOMBSTONE):
+                    records.pop(record[self.key], None)
+                else:
+                    records[record[self.key]] = record
+                offset += len(line)
+        return list(records.values())
+
+
+    # Replaces the whole store with the given records.
+    def rewrite(self, records):
+        self._check_writable()
+        tmp_path = self.file_path + ".tmp"
+        offsets = {}
+        offset = 0
+        with open(tmp_path, "wb") as f:
+            for record in records:
+                line = JsonUtils.dumps(record) + b"\n"
+                f.write(line)
+                offsets[record[self.key]] = offset
+                offset += len(line)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.file_path)
+        self.file_id = self._file_id()
+
+        self.offsets = offsets
+        self.line_count = len(offsets)
+        self.committed_bytes = offset
+        if self.index_path:
+            self._write_index()
+        self._write_checkpoint()
+
+
+    # Drops superseded lines so the file holds one line per key again.
+    def compact(self):
+        self.commit()
+        before = self.line_count
+        self.rewrite(self.load())
+        print(f"🗜️ Compacted {self.file_path}: {before} → {self.line_count} lines")
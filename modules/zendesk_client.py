@@ -0,0 +1,154 @@
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from modules.request_scheduler import RequestScheduler
+
+
+class ZendeskClient:
+    # Shared fetch engine for the Zendesk API.
+    # One requests.Session keeps connections alive between calls, fetch_many
+    # spreads requests over a pool of worker threads, and a RequestScheduler
+    # paces all of them against the account's rate limit.
+    base_url = "https://larsa4d.zendesk.com/api/v2"
+
+    def __init__(self, access_token, workers=8, max_in_flight=None, max_retries=5, timeout=10, scheduler=None):
+        self.workers = workers
+        self.max_in_flight = max_in_flight or workers * 4
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.scheduler = scheduler or RequestScheduler()
+
+        # one pooled connection per worker so no thread waits on a socket
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Authorization": f"Bearer {access_token}"})
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+    def close(self):
+        self.session.close()
+
+
+    # Accepts either a full url (e.g. a "next" link) or a path like "/tickets/10"
+    def url(self, path):
+        if path.startswith("http"):
+            return path
+        return self.base_url + path
+
+
+    # Returns the decoded JSON body, or None once all retries have failed.
+    # Every request waits for the scheduler; 429s, 5xx responses and connection errors are
+    # retried with backoff, and if they still fail the path ends up in the dead-letter list.
+    # Other 4xx answers (e.g. a deleted ticket) will not change on a re-drive, so they are
+    # not dead-lettered.
+    def get_json(self, path):
+        data, error, retryable = self._get(path)
+        if data is None:
+            print(f"❌ Failed to fetch {self.url(path)}: {error}")
+            if retryable:
+                self.scheduler.dead_letter(path, error)
+        return data
+
+
+    # get_json without the dead-letter step: returns (data, error, retryable)
+    def _get(self, path):
+        url = self.url(path)
+        attempt = 0
+        error = None
+
+        while attempt < self.max_retries:
+            self.scheduler.acquire()
+            try:
+                response = self.session.get(url, timeout=self.timeout)
+                self.scheduler.update(response.headers)
+
+                if response.status_code == 429:
+                    attempt += 1
+                    wait = self.scheduler.retry_after(response.headers) or self.scheduler.backoff(attempt)
+                    print(f"🐢 Rate limited on {url}, pausing {wait:.1f} seconds...")
+                    self.scheduler.pause(wait)
+                    error = "429 Too Many Requests"
+                    continue
+
+                response.raise_for_status()
+                return response.json(), None, False
+
+            except requests.exceptions.RequestException as e:
+                error = e
+                status = e.response.status_code if e.response is not None else None
+                if status is not None and 400 <= status < 500:
+                    return None, e, False
+
+                attempt += 1
+                print(f"⚠️ Error fetching {url} (Attempt {attempt}/{self.max_retries}): {e}")
+                if attempt < self.max_retries:
+                    delay = self.scheduler.backoff(attempt)
+                    print(f"⏳ Retrying in {delay:.1f} seconds...")
+                    time.sleep(delay)
+
+        return None, error, True
+
+
+    # Follows the pages of a list endpoint (cursor pagination: meta.has_more + links.next,
+    # offset pagination: next_page) and returns the first page with data[key] holding the
+    # items of all pages. Returns None if any page fails. A later page that fails with a
+    # retryable error dead-letters the first path (not the page url), so a re-drive
+    # fetches the whole list again.
+    def get_all_pages(self, path, key):
+        first = self.get_json(path)
+        if first is None:
+            return None
+
+        items = list(first.get(key, []))
+        page = first
+        while True:
+            if page.get("meta", {}).get("has_more"):
+                next_path = page.get("links", {}).get("next")
+            else:
+                next_path = page.get("next_page")
+            if not next_path:
+                break
+
+            page, error, retryable = self._get(next_path)
+            if page is None:
+                print(f"❌ Failed to fetch {self.url(next_path)}: {error}")
+                if retryable:
+                    self.scheduler.dead_letter(path, f"incomplete pagination at {next_path}: {error}")
+                return None
+            items.extend(page.get(key, []))
+
+        first[key] = items
+        first.setdefault("count", len(items))   # cursor pages have no total count
+        return first
+
+
+    # Fetches path_for(item) for every item on the worker pool.
+    # Yields (item, data) pairs in the same order as items; data is None on failure.
+    # With key, every page of a paginated list is fetched (see get_all_pages).
+    # At most max_in_flight requests are queued, so items can be a lazy iterator.
+    def fetch_many(self, items, path_for, key=None):
+        fetch = self.get_json if key is None else lambda path: self.get_all_pages(path, key)
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            in_flight = deque()
+            for item in items:
+                in_flight.append((item, pool.submit(fetch, path_for(item))))
+                if len(in_flight) >= self.max_in_flight:
+                    done_item, future = in_flight.popleft()
+                    yield done_item, future.result()
+
+            while in_flight:
+                done_item, future = in_flight.popleft()
+                yield done_item, future.result()
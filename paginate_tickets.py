@@ -1,50 +1,67 @@
-import requests
-import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
 from zendesk_token import load_tokens
+from modules.ticket_store import TicketStore
+from modules.zendesk_client import ZendeskClient
 
-tokens = load_tokens()
-access_token = tokens["access_token"]
 
-ticket_file = "tickets.json"
+ticket_file = "tickets.jsonl"
 
 
+# Walks the cursor-paginated ticket list and appends every page to ticket_file.
+# The links.next cursor is committed with each page, so a restart resumes after the
+# last saved page, and the next page is already being fetched while this one is written.
 def paginate_tickets():
     url = "https://larsa4d.zendesk.com/api/v2/tickets.json?page[size]=100"
 
-    headers = {
-        'Authorization': f'Bearer {access_token}',
-    }
+    tokens = load_tokens()
+    client = ZendeskClient(tokens["access_token"], workers=1)
+    store = TicketStore(ticket_file, key="ticket_id")
+
+    # after a finished run we start over from the first page and only append unseen tickets
+    if store.state.get("next_url"):
+        url = store.state["next_url"]
+        print(f"↩️ Resuming after {len(store)} saved tickets")
+
+    with ThreadPoolExecutor(max_workers=1) as prefetch:
+        next_page = prefetch.submit(client.get_json, url)
 
-    try:
-        with open(ticket_file, "r") as f:
-            tickets = json.load(f)
-    except FileNotFoundError:
-        tickets = []
+        while True:
+            page = next_page.result()
+            if page is None:
+                print(f"❌ Stopped at {url}, run again to resume from here.")
+                break
 
-    while True:
-        response = requests.get(url, headers=headers)
-        page = response.json()
-        ticket_list = page["tickets"]
+            # checking if there is any next page. check the syntax
+            has_more = page["meta"]["has_more"]
+            if has_more:
+                url = page["links"]["next"]
+                next_page = prefetch.submit(client.get_json, url)
 
-        for ticket in ticket_list:
+            page_ids = set()
+            for ticket in page["tickets"]:
+                if ticket["id"] in store or ticket["id"] in page_ids:
+                    continue
+                page_ids.add(ticket["id"])
 
-            tickets.append({
-                "ticket_id": ticket["id"],
-                "type": ticket.get("type", None),
-                "tags": ticket.get("tags", [])
-            })
+                store.add({
+                    "ticket_id": ticket["id"],
+                    "type": ticket.get("type", None),
+                    "tags": ticket.get("tags", [])
+                })
 
-        save_tickets(tickets)
+            if has_more:
+                store.commit(state={"next_url": url})
+            else:
+                store.commit(state={})
+                print(f"✅ Paginated {len(store)} tickets.")
+                break
 
-        # checking if there is any next page. check the syntax
-        if not page["meta"]["has_more"]:
-            break
-        
-        # updating the url
-        url = page["links"]["next"]
+    client.close()
 
-def save_tickets(ticket_data):
-    with open(ticket_file, "w") as f:
-        json.dump(ticket_data, f, indent=2)
 
-paginate_tickets()
+# python paginate_tickets.py, see cli.py
+if __name__ == "__main__":
+    from cli import main
+    main(["paginate_tickets", *sys.argv[1:]])
@@ -0,0 +1,55 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+from modules.analytics_server import AnalyticsServer
+from modules.ticket_store import TicketStore
+
+
+class AnalyticsServerTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        ticket_file = os.path.join(self.tmp_dir.name, "all_tickets.jsonl")
+        with TicketStore(ticket_file) as store:
+            for month in range(1, 7):
+                store.add({"id": month, "type": "question", "tags": ["bug"], "date_created": f"2024-{month:02d}-10"})
+
+        self.server = AnalyticsServer(ticket_file, port=0)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp_dir.cleanup()
+
+    def get(self, path):
+        try:
+            with urlopen(self.base_url + path, timeout=5) as response:
+                return response.status, json.load(response)
+        except HTTPError as e:
+            return e.code, json.load(e)
+
+    def test_trends_by_period(self):
+        status, body = self.get("/trends?tags=bug&start=2024-02-01&end=2024-05-01")
+        self.assertEqual(status, 200)
+        self.assertEqual(body["index"], ["2024-02-01", "2024-03-01", "2024-04-01"])
+        self.assertEqual(body["series"], {"bug": [1, 1, 1]})
+
+    def test_bad_dates_are_rejected_and_the_server_keeps_answering(self):
+        for query in ("start=notadate", "end=2024-13-01", "start=2024-01-01&end=later"):
+            with self.subTest(query=query):
+                status, body = self.get(f"/trends?tags=bug&{query}")
+                self.assertEqual(status, 400)
+                self.assertIn("must be a date", body["error"])
+
+        status, body = self.get("/status")
+        self.assertEqual((status, body["tickets"]), (200, 6))
+
+
+if __name__ == "__main__":
+    unittest.main()
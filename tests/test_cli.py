@@ -0,0 +1,89 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+from cli import build_parser
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("matplotlib", "scipy", "networkx")
+# import of cli plus the command itself, interpreter start-up not included
+BUDGET_SECONDS = 0.1
+
+# Runs cli.main(argv) in a fresh interpreter and prints how long it took and
+# which of the heavy modules it loaded
+CHILD = """
+import contextlib, io, json, sys, time
+start = time.perf_counter()
+import cli
+with contextlib.redirect_stdout(io.StringIO()):
+    try:
+        cli.main(sys.argv[1:])
+    except SystemExit:
+        pass
+elapsed = time.perf_counter() - start
+print(json.dumps({"elapsed": elapsed, "loaded": [name for name in %r if name in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+class CliTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        data_dir = os.path.join(self.tmp_dir.name, "data")
+        os.makedirs(data_dir)
+        with open(os.path.join(data_dir, "all_tickets.jsonl"), "w", encoding="utf-8") as f:
+            for ticket_id in range(1, 51):
+                ticket = {
+                    "id": ticket_id,
+                    "type": ("question", "problem", "incident")[ticket_id % 3],
+                    "tags": ["bug", f"tag_{ticket_id % 7}"],
+                    "date_created": f"2024-{ticket_id % 12 + 1:02d}-01",
+                    "date_solved": f"2024-{ticket_id % 12 + 1:02d}-15",
+                }
+                f.write(json.dumps(ticket) + "\n")
+        with open(os.path.join(data_dir, "ignored_tags.json"), "w", encoding="utf-8") as f:
+            json.dump(["bug"], f)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def run_cli(self, *argv):
+        env = dict(os.environ, PYTHONPATH=ROOT, MPLBACKEND="Agg")
+        result = subprocess.run(
+            [sys.executable, "-c", CHILD, *argv],
+            cwd=self.tmp_dir.name, env=env, capture_output=True, text=True, timeout=60,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def assert_light(self, *argv):
+        run = self.run_cli(*argv)
+        self.assertEqual(run["loaded"], [])
+        self.assertLess(run["elapsed"], BUDGET_SECONDS)
+
+    def test_help_is_light(self):
+        self.assert_light("--help")
+
+    def test_summary_is_light(self):
+        # the first run builds the analytics cache, the budget is for the cached run
+        self.run_cli("summary")
+        self.assert_light("summary")
+
+    def test_workers_is_positional(self):
+        parser = build_parser()
+        self.assertEqual(parser.parse_args(["import_all_tickets", "4"]).workers, 4)
+        self.assertIsNone(parser.parse_args(["import_all_tickets"]).workers)
+        args = parser.parse_args(["export_comments", "2", "--no-hardlinks"])
+        self.assertEqual((args.workers, args.hardlinks), (2, False))
+
+    def test_script_commands(self):
+        parser = build_parser()
+        self.assertEqual(parser.parse_args(["get_comments", "12"]).ticket_id, 12)
+        self.assertEqual(parser.parse_args(["paginate_tickets"]).command, "paginate_tickets")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import os
+import tempfile
+import unittest
+
+from modules.ticket_store import TicketStore
+
+
+class TicketStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.tmp_dir.name, "tickets.jsonl")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def write(self, records, **options):
+        with TicketStore(self.file_path, **options) as store:
+            store.add_many(records)
+        return store
+
+    # bytes a crashed writer left after the checkpoint
+    def append_garbage(self, path, data=b'{"id": 99, "tags": []}\n{"id": 100, "ta'):
+        with open(path, "ab") as f:
+            f.write(data)
+
+    def test_later_lines_replace_earlier_ones(self):
+        self.write([{"id": 1, "tags": ["a"]}, {"id": 2, "tags": []}, {"id": 1, "tags": ["b"]}])
+
+        store = TicketStore(self.file_path)
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.get(1), {"id": 1, "tags": ["b"]})
+        self.assertEqual([record["id"] for record in store.load()], [1, 2])
+        self.assertEqual([record["id"] for record in store.iter_records()], [2, 1])
+        self.assertEqual(store.last_id, 1)
+
+    def test_state_is_saved_with_the_checkpoint(self):
+        store = self.write([{"id": 1}])
+        store.commit(state={"ticket_cursor": "abc"})
+
+        self.assertEqual(TicketStore(self.file_path).state, {"ticket_cursor": "abc"})
+
+    def test_bytes_past_the_checkpoint_are_truncated(self):
+        self.write([{"id": 1}, {"id": 2}])
+        committed = os.path.getsize(self.file_path)
+        self.append_garbage(self.file_path)
+
+        store = TicketStore(self.file_path)
+        self.assertEqual(os.path.getsize(self.file_path), committed)
+        self.assertEqual(len(store), 2)
+        self.assertNotIn(99, store)
+
+        store.append([{"id": 3}])
+        self.assertEqual([record["id"] for record in TicketStore(self.file_path).load()], [1, 2, 3])
+
+    def test_readonly_never_truncates_or_writes(self):
+        self.write([{"id": 1}, {"id": 2}])
+        self.append_garbage(self.file_path)
+        size = os.path.getsize(self.file_path)
+
+        store = TicketStore(self.file_path, readonly=True)
+        self.assertEqual(os.path.getsize(self.file_path), size)
+        self.assertEqual(len(store), 2)
+        self.assertEqual([record["id"] for record in store.iter_records()], [1, 2])
+
+        store.commit()   # nothing pending, nothing to refuse
+        store.add({"id": 3})
+        with self.assertRaises(ValueError):
+            store.commit()
+        with self.assertRaises(ValueError):
+            store.rewrite([])
+        self.assertEqual(os.path.getsize(self.file_path), size)
+
+    def test_tombstones_remove_records(self):
+        self.write([{"id": 1}, {"id": 2}, {"id": 3}])
+        with TicketStore(self.file_path) as store:
+            store.delete(2)
+
+        store = TicketStore(self.file_path)
+        self.assertEqual(len(store), 2)
+        self.assertNotIn(2, store)
+        self.assertIsNone(store.get(2))
+        self.assertEqual([record["id"] for record in store.load()], [1, 3])
+        self.assertEqual([record["id"] for record in store.iter_records()], [1, 3])
+
+        store.compact()
+        self.assertEqual(store.line_count, 2)
+        self.assertEqual([record["id"] for record in TicketStore(self.file_path).load()], [1, 3])
+
+    def test_index_recovery(self):
+        self.write([{"id": 1, "tags": ["a"]}, {"id": 2}], index=True)
+        with TicketStore(self.file_path, index=True) as store:
+            store.add({"id": 1, "tags": ["b"]})
+            store.delete(2)
+        index_path = self.file_path + ".idx"
+        committed = os.path.getsize(self.file_path), os.path.getsize(index_path)
+        self.append_garbage(self.file_path)
+        self.append_garbage(index_path, b'[99, 1000]\n')
+
+        store = TicketStore(self.file_path, index=True)
+        self.assertEqual((os.path.getsize(self.file_path), os.path.getsize(index_path)), committed)
+        self.assertEqual(list(store.offsets), [1])
+        self.assertEqual(store.get(1), {"id": 1, "tags": ["b"]})
+
+    def test_refresh_picks_up_lines_a_writer_committed(self):
+        self.write([{"id": 1}, {"id": 2}])
+        reader = TicketStore(self.file_path, readonly=True)
+        old_offsets = dict(reader.offsets)
+
+        with TicketStore(self.file_path) as writer:
+            writer.add_many([{"id": 3}, {"id": 1, "tags": ["b"]}])
+            writer.delete(2)
+        self.append_garbage(self.file_path)   # the writer's next batch in progress
+
+        records, replaced = reader.refresh()
+        self.assertEqual(records, [{"id": 3}, {"id": 1, "tags": ["b"]}])
+        self.assertEqual(sorted(replaced), [old_offsets[1], old_offsets[2]])
+        self.assertEqual(sorted(reader.offsets), [1, 3])
+        self.assertEqual(reader.refresh(), ([], []))
+
+    def test_refresh_after_a_rewrite_asks_for_a_reopen(self):
+        self.write([{"id": 1}, {"id": 2}])
+        reader = TicketStore(self.file_path, readonly=True)
+        TicketStore(self.file_path).rewrite([{"id": 2}])
+
+        self.assertIsNone(reader.refresh())
+
+
+if __name__ == "__main__":
+    unittest.main()
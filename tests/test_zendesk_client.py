@@ -0,0 +1,133 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from modules.request_scheduler import RequestScheduler
+from modules.zendesk_client import ZendeskClient
+
+
+# Local stand-in for the Zendesk API:
+#   /items/<n>       {"id": n}, answered slower for smaller n so requests finish out of order
+#   /flaky/<status>  fails once with that status (429 or 5xx), then answers {"ok": true}
+#   /broken          always 500
+#   /missing         always 404
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.calls[self.path] = server.calls.get(self.path, 0) + 1
+            calls = server.calls[self.path]
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            if self.path.startswith("/items/"):
+                item = int(self.path.rsplit("/", 1)[1])
+                time.sleep(max(0, 20 - item) * 0.002)
+                self._send(200, {"id": item})
+            elif self.path.startswith("/flaky/"):
+                status = int(self.path.rsplit("/", 1)[1])
+                if calls == 1:
+                    self._send(status, {"error": "try again"}, {"Retry-After": "0"})
+                else:
+                    self._send(200, {"ok": True})
+            elif self.path == "/broken":
+                self._send(500, {"error": "boom"})
+            else:
+                self._send(404, {"error": "not found"})
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def _send(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ZendeskClientTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        self.server.lock = threading.Lock()
+        self.server.calls = {}
+        self.server.active = 0
+        self.server.max_active = 0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.dead_letter_file = os.path.join(self.tmp_dir.name, "dead_letters.json")
+        scheduler = RequestScheduler(rate=1000, burst=1000, base_delay=0.01, max_delay=0.05,
+                                     dead_letter_file=self.dead_letter_file)
+        self.client = ZendeskClient("token", workers=4, max_in_flight=6, max_retries=3, scheduler=scheduler)
+        self.client.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp_dir.cleanup()
+
+    def test_fetch_many_yields_in_input_order(self):
+        items = list(range(20))
+        results = list(self.client.fetch_many(items, lambda item: f"/items/{item}"))
+
+        self.assertEqual([item for item, _ in results], items)
+        self.assertEqual([data["id"] for _, data in results], items)
+
+    def test_fetch_many_bounds_the_requests_in_flight(self):
+        pulled = []
+
+        def items():
+            for item in range(30):
+                pulled.append(item)
+                yield item
+
+        first_yield_pulled = None
+        for _ in self.client.fetch_many(items(), lambda item: f"/items/{item}"):
+            if first_yield_pulled is None:
+                first_yield_pulled = len(pulled)
+
+        # the lazy input is only read max_in_flight items ahead
+        self.assertLessEqual(first_yield_pulled, self.client.max_in_flight)
+        self.assertEqual(len(pulled), 30)
+        self.assertLessEqual(self.server.max_active, self.client.workers)
+
+    def test_get_json_retries_429_and_5xx(self):
+        for status in (429, 500, 503):
+            with self.subTest(status=status):
+                self.assertEqual(self.client.get_json(f"/flaky/{status}"), {"ok": True})
+                self.assertEqual(self.server.calls[f"/flaky/{status}"], 2)
+        self.assertEqual(self.client.scheduler.dead_letters, [])
+
+    def test_retryable_failures_are_dead_lettered(self):
+        self.assertIsNone(self.client.get_json("/broken"))
+        self.assertEqual(self.server.calls["/broken"], self.client.max_retries)
+
+        with open(self.dead_letter_file, "r", encoding="utf-8") as f:
+            saved = json.load(f)
+        self.assertEqual([entry["path"] for entry in saved], ["/broken"])
+        self.assertEqual(
+            [entry["path"] for entry in self.client.scheduler.take_dead_letters()], ["/broken"]
+        )
+
+    def test_permanent_4xx_is_not_retried_or_dead_lettered(self):
+        self.assertIsNone(self.client.get_json("/missing"))
+        self.assertEqual(self.server.calls["/missing"], 1)
+        self.assertEqual(self.client.scheduler.dead_letters, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,32 +1,101 @@
+import os
 import sys
 
-from modules.ticket_data import TicketData
 from modules.json_utils import JsonUtils
 
 
 
 
-ticket_file = "D:/Desktop/larsa_AI_project/zendesk/data/all_tickets.json"
+ticket_file = "D:/Desktop/larsa_AI_project/zendesk/data/all_tickets.jsonl"
+old_ticket_file = "D:/Desktop/larsa_AI_project/zendesk/data/all_tickets.json"
 tag_file = "D:/Desktop/larsa_AI_project/zendesk/data/all_tags.json"
 output_base = "D:/Desktop/larsa_AI_project/zendesk/ticket_comments"
 ignored_tags_file = "D:/Desktop/larsa_AI_project/zendesk/data/ignored_tags.json"
+comment_file = "D:/Desktop/larsa_AI_project/zendesk/data/comments.jsonl"
+tag_alias_file = "D:/Desktop/larsa_AI_project/zendesk/data/tag_aliases.json"
+folder_manifest_file = "D:/Desktop/larsa_AI_project/zendesk/data/folder_manifest.json"
+agent_ids_file = "D:/Desktop/larsa_AI_project/zendesk/data/agent_ids.json"
+organized_comment_file = "D:/Desktop/larsa_AI_project/zendesk/data/organized_comments.jsonl"
 
-ignored_tags = JsonUtils.load_json(ignored_tags_file)
 
-tickets = TicketData(ticket_file)
+# One function per command (see cli.py); each one loads only the data it uses.
+def load_tickets():
+    from modules.ticket_data import TicketData
+    return TicketData(ticket_file)
 
 
-if sys.argv[1] == "clean_tags":
-    tickets.clean_tags()
+# converts the ticket list of older versions (all_tickets.json) into the ticket store once;
+# embedded comments are kept, so split_comments can move them afterwards
+def migrate_tickets():
+    from modules.ticket_store import TicketStore
 
-if sys.argv[1] == "sanitize_tags":
-    tickets.sanitize_tags()
+    if os.path.exists(ticket_file):
+        print(f"⚠️ {ticket_file} already exists, nothing was migrated.")
+        return
+    tickets = JsonUtils.load_json(old_ticket_file)
+    TicketStore(ticket_file).rewrite(tickets)
+    print(f"✅ Migrated {len(tickets)} tickets from {old_ticket_file} to {ticket_file}")
 
-elif sys.argv[1] == "seperate_version_tags":
-    tickets.seperate_version_tags()
 
-elif sys.argv[1] == "get_tags":
-    tickets.get_tags(tag_file)
+def canonicalizer():
+    from modules.tag_canonicalizer import TagCanonicalizer
+    alias_file = tag_alias_file if os.path.exists(tag_alias_file) else None
+    return TagCanonicalizer(alias_file=alias_file)
 
-elif sys.argv[1] == "create_folders":
-    tickets.create_tag_subfolders(output_base, ignore_tags=ignored_tags)
\ No newline at end of file
+
+def clean_tags():
+    load_tickets().clean_tags(canonicalizer())
+
+
+def sanitize_tags():
+    load_tickets().sanitize_tags()
+
+
+def seperate_version_tags():
+    load_tickets().seperate_version_tags()
+
+
+# clean + sanitize + version split in one pass and one save; dry_run only shows the changes
+def maintain_tags(dry_run=False):
+    tickets = load_tickets()
+    pipeline = (
+        tickets.tag_pipeline()
+        .clean(canonicalizer())
+        .sanitize()
+        .split_versions()
+    )
+    tickets.transform_tags(pipeline, dry_run=dry_run)
+    print(f"🏷️ Tag changes per step: {dict(pipeline.counts)}")
+
+
+def get_tags():
+    load_tickets().get_tags(tag_file)
+
+
+def create_folders():
+    ignored_tags = JsonUtils.load_json(ignored_tags_file)
+    load_tickets().create_tag_subfolders(
+        output_base, ignore_tags=ignored_tags, workers=8, manifest_file=folder_manifest_file
+    )
+
+
+# moves comments embedded by older imports into the comment store
+def split_comments():
+    from modules.comment_store import CommentStore
+
+    tickets = load_tickets()
+    moved = CommentStore(comment_file).split_from_tickets(tickets)
+    print(f"📦 Moved comments of {moved} tickets to {comment_file}")
+    tickets.save()
+
+
+# every thread as {"ticket_id": ..., "replies": [{"role", "visibility", "message"}, ...]}
+def organize_comments():
+    from modules.comment_data import CommentData
+    CommentData.organize_threads(comment_file, agent_ids_file, organized_comment_file)
+
+
+# python tickets_script.py <command> [--dry-run], see cli.py
+if __name__ == "__main__":
+    from cli import main
+    main(sys.argv[1:])
@@ -1,23 +1,68 @@
-import requests
 import sys
 import csv
+import re
 import time
+from datetime import datetime, timezone
 
 from zendesk_token import load_tokens
-from modules.json_utils import JsonUtils
-from modules.ticket_data import TicketData
+from modules.comment_store import CommentStore
+from modules.ticket_store import TicketStore
+from modules.zendesk_client import ZendeskClient
 
 
-tokens = load_tokens()
-access_token = tokens["access_token"]
+# The token is only read when a command actually talks to Zendesk.
+# workers is the number of concurrent requests.
+def zendesk_client(workers=8):
+    tokens = load_tokens()
+    return ZendeskClient(tokens["access_token"], workers=workers)
 
 
-def import_all_tickets():
-    ticket_file = "data/all_tickets.json"
+# Fills in the tags of CSV-derived tickets with one show_many call per 100 ids.
+# Yields the hydrated tickets in the original order. A batch that fails is retried one
+# ticket at a time, so one bad id only loses its own ticket.
+def hydrate_tickets(client, tickets, batch_size=100):
+    batches = [tickets[i:i + batch_size] for i in range(0, len(tickets), batch_size)]
+
+    for batch, data in client.fetch_many(batches, lambda b: show_many_path(t["id"] for t in b)):
+        if data is None:
+            print(f"❌ Failed to fetch tickets {batch[0]["id"]}-{batch[-1]["id"]}, retrying them one by one.")
+            yield from hydrate_tickets_one_by_one(client, batch)
+            continue
+
+        found = {ticket_data["id"]: ticket_data for ticket_data in data["tickets"]}
+        for ticket in batch:
+            if ticket["id"] not in found:
+                print(f"⚠️ Ticket {ticket["id"]} was not returned (deleted?)")
+                continue
+            ticket["tags"] = found[ticket["id"]].get("tags", [])
+            yield ticket
+
+
+# hydrate_tickets with one request per ticket, so a bad id only fails itself (see redrive_failed)
+def hydrate_tickets_one_by_one(client, tickets):
+    for ticket, data in client.fetch_many(tickets, lambda t: f"/tickets/{t["id"]}.json"):
+        if data is None:
+            print(f"❌ Failed to fetch ticket {ticket["id"]}.")
+            continue
+        ticket["tags"] = data["ticket"].get("tags", [])
+        yield ticket
+
+
+def show_many_path(ids):
+    return "/tickets/show_many.json?ids=" + ",".join(str(ticket_id) for ticket_id in ids)
+
+
+def import_all_tickets(workers=8):
+    ticket_file = "data/all_tickets.jsonl"
     csv_file = "data/ticket_list.csv"
 
     tickets = []
 
+    # Tickets are appended to the store in batches; a restart skips everything already committed
+    store = TicketStore(ticket_file, batch_size=100)
+    if store.last_id is not None:
+        print(f"↩️ Resuming import after ticket {store.last_id} ({len(store)} tickets already saved)")
+
     # Load ticket IDs from CSV
     with open(csv_file, "r", newline="", encoding="utf-8") as csvfile:
         reader = csv.DictReader(csvfile)
@@ -33,196 +78,255 @@ def import_all_tickets():
                 "tags": [],
             }
 
+            if ticket["id"] in store:
+                continue
             tickets.append(ticket)
 
-    headers = {"Authorization": f"Bearer {access_token}"}
-
-    for ticket in tickets:
-        url = "https://larsa4d.zendesk.com/api/v2/tickets/" + str(ticket.get("id"))
-
-        max_retries = 3
-        retry_delay = 5  # seconds
-        attempt = 0
-        success = False
-
-        while attempt < max_retries and not success:
-            try:
-                response = requests.get(url, headers=headers, timeout=10)
-                response.raise_for_status()
-                ticket_data = response.json()["ticket"]
-
-                ticket["tags"] = ticket_data.get("tags", [])
-
-                JsonUtils.save_list_to_json(tickets, ticket_file)
-                print(f"✅ Saved ticket {ticket["id"]}")
-
-                success = True  # if we reach here, request was successful
-
-            except requests.exceptions.RequestException as e:
-                attempt += 1
-                print(
-                    f"⚠️ Error fetching ticket {ticket["id"]} (Attempt {attempt}/{max_retries}): {e}"
-                )
-                if attempt < max_retries:
-                    print(f"⏳ Retrying in {retry_delay} seconds...")
-                    time.sleep(retry_delay)
-                else:
-                    print(
-                        f"❌ Failed to fetch ticket {ticket["id"]} after {max_retries} attempts."
-                    )
+    with zendesk_client(workers) as client:
+        for ticket in hydrate_tickets(client, tickets):
+            store.add(ticket)
+            print(f"✅ Saved ticket {ticket["id"]}")
 
+    store.commit()
     print("✅ Import complete.")
 
 
-def import_new_tickets():
-
-    ticket_file = "data/all_tickets.json"
-    csv_file = "data/ticket_list.csv"
-    tickets = TicketData(ticket_file)
-
-    last_ticket_id = tickets.get_last_ticket_id()
-    start_appending = False
-    new_ticket = {}
-    new_tickets = []
-
-    with open(csv_file, "r", newline="", encoding="utf-8") as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            if start_appending:
-                new_ticket = {
-                    "id": int(row["Ticket ID"]),
-                    "date_created": row["Ticket created - Date"],
-                    "date_solved": row["Ticket solved - Date"],
-                    "type": row["Ticket type"],
-                    "tags": [],
-                }
-                new_tickets.append(new_ticket)
-
-            elif int(row["Ticket ID"]) == last_ticket_id:
-                start_appending = True
-
-    headers = {
-        "Authorization": f"Bearer {access_token}",
+# Maps an API ticket onto the record layout of the CSV import.
+# Fields the API does not provide (e.g. date_solved) are kept from the existing record.
+def ticket_record(ticket_data, existing=None):
+    record = existing or {
+        "id": ticket_data["id"],
+        "date_created": ticket_data["created_at"][:10],
+        "date_solved": "",
+        "type": (ticket_data.get("type") or "").title(),
+        "tags": [],
     }
+    record["tags"] = ticket_data.get("tags", [])
+    # tags are raw again, so let seperate_version_tags process this ticket on its next run
+    record.pop("version", None)
+    return record
 
-    for ticket in new_tickets:
-        url = "https://larsa4d.zendesk.com/api/v2/tickets/" + str(ticket.get("id"))
-
-        max_retries = 3
-        retry_delay = 5  # seconds
-        attempt = 0
-        success = False
-
-        while attempt < max_retries and not success:
-            try:
-                response = requests.get(url, headers=headers, timeout=10)
-                response.raise_for_status()
-                ticket_data = response.json()["ticket"]
-
-                ticket["tags"] = ticket_data.get("tags", [])
 
-                print(f"✅ Saved ticket {ticket["id"]}")
+# Unix time of the newest ticket in the store, used to start the very first incremental sync
+def newest_ticket_time(store):
+    dates = [ticket["date_created"] for ticket in store.iter_records() if ticket.get("date_created")]
+    if not dates:
+        return 0
+    newest = datetime.strptime(max(dates)[:10], "%Y-%m-%d").replace(tzinfo=timezone.utc)
+    return int(newest.timestamp())
 
-                success = True  # if we reach here, request was successful
 
-            except requests.exceptions.RequestException as e:
-                attempt += 1
-                print(
-                    f"⚠️ Error fetching ticket {ticket["id"]} (Attempt {attempt}/{max_retries}): {e}"
-                )
-                if attempt < max_retries:
-                    print(f"⏳ Retrying in {retry_delay} seconds...")
-                    time.sleep(retry_delay)
-                else:
-                    print(
-                        f"❌ Failed to fetch ticket {ticket["id"]} after {max_retries} attempts."
-                    )
-
-    JsonUtils.append_list_to_json(new_tickets, ticket_file)
-    print("✅ Import complete.")
-
-
-def import_all_comments():
-
-    ticket_file = "data/all_tickets.json"
-    tickets = TicketData(ticket_file)
-
-    headers = {"Authorization": f"Bearer {access_token}"}
-
-    for ticket in tickets:
-        ticket["ticket_comments"] = []
-        ticket["comment_count"] = None
-
-        url = f"https://larsa4d.zendesk.com/api/v2/tickets/{ticket.get("id")}/comments"
-
-        max_retries = 3
-        retry_delay = 5  # seconds
-        attempt = 0
-        success = False
-
-        while attempt < max_retries and not success:
-            try:
-                response = requests.get(url, headers=headers, timeout=10)
-                response.raise_for_status()
-
-                comment_data = response.json()["comments"]
-                count_data = response.json()["count"]
-
-                ticket["ticket_comments"] = comment_data
-                ticket["comment_count"] = int(count_data)
-
-                print(f"✅ Saved ticket comment {ticket["id"]}")
-                success = True  # if we reach here, request was successful
-
-            except requests.exceptions.RequestException as e:
-                attempt += 1
-                print(
-                    f"⚠️ Error fetching ticket {ticket["id"]} (Attempt {attempt}/{max_retries}): {e}"
-                )
-                if attempt < max_retries:
-                    print(f"⏳ Retrying in {retry_delay} seconds...")
-                    time.sleep(retry_delay)
-                else:
-                    print(
-                        f"❌ Failed to fetch ticket comment {ticket["id"]} after {max_retries} attempts."
-                    )
+# Pulls every ticket created or updated since the last sync from the incremental export
+# and upserts it into the store by id. The export cursor is committed together with each
+# page, so the next run (or a restart after a crash) continues where this one stopped.
+def import_new_tickets():
+    ticket_file = "data/all_tickets.jsonl"
+    store = TicketStore(ticket_file)
+
+    cursor = store.state.get("ticket_cursor")
+    if cursor:
+        path = f"/incremental/tickets/cursor.json?cursor={cursor}"
+    else:
+        path = f"/incremental/tickets/cursor.json?start_time={newest_ticket_time(store)}"
+
+    synced = 0
+    deleted = 0
+    with zendesk_client(1) as client:
+        while True:
+            page = client.get_json(path)
+            if page is None:
+                print("❌ Incremental export stopped, run again to continue from the last page.")
+                break
+
+            for ticket_data in page["tickets"]:
+                # a tombstone removes a deleted ticket from the store for every reader
+                if ticket_data.get("status") == "deleted":
+                    store.delete(ticket_data["id"])
+                    deleted += 1
+                    continue
+                store.add(ticket_record(ticket_data, store.get(ticket_data["id"])))
+                synced += 1
+
+            cursor = page.get("after_cursor") or cursor
+            store.commit(state={**store.state, "ticket_cursor": cursor})
+            print(f"✅ Synced {synced} tickets so far, {deleted} deleted")
+
+            if page["end_of_stream"]:
+                break
+            path = page["after_url"]
+
+    print(f"✅ Import complete, {synced} new or changed tickets, {deleted} deleted.")
+
+
+# Fetches the complete comment thread (all pages) of every given ticket into the comment store.
+# Only comment_count is kept on the ticket itself. Yields each ticket as soon as its thread is
+# in the store, so callers can write the tickets back in batches while the fetch goes on.
+def fetch_comments(client, tickets, comments):
+    for ticket, data in client.fetch_many(tickets, lambda t: comments_path(t["id"]), key="comments"):
+        if data is None:
+            print(f"❌ Failed to fetch ticket comment {ticket["id"]}.")
+            continue
+
+        comments.add_thread(ticket["id"], data["comments"], int(data["count"]))
+        ticket["comment_count"] = int(data["count"])
+        print(f"✅ Saved ticket comment {ticket["id"]}")
+        yield ticket
+
+    comments.commit()
+
+
+def comments_path(ticket_id):
+    return f"/tickets/{ticket_id}/comments?page[size]=100"
+
+
+# Threads are committed to the comment store every 100 tickets and the updated tickets
+# every 500, so an interrupted run loses at most one batch. A restart continues from the
+# ticket store: tickets with a comment_count are done, tickets whose thread was committed
+# but whose ticket record was not only get comment_count from that thread, the rest are fetched.
+def import_all_comments(workers=8):
+
+    ticket_file = "data/all_tickets.jsonl"
+    comment_file = "data/comments.jsonl"
+    store = TicketStore(ticket_file)
+
+    with zendesk_client(workers) as client, CommentStore(comment_file) as comments:
+        pending_ids = []
+        repaired = 0
+        for ticket in store.iter_records():
+            if ticket.get("comment_count") is not None:
+                continue
+            if ticket["id"] in comments:
+                ticket["comment_count"] = comments.get(ticket["id"])["count"]
+                store.add(ticket)
+                repaired += 1
+            else:
+                pending_ids.append(ticket["id"])
+        store.commit()
+        print(f"📥 Fetching comments for {len(pending_ids)} tickets ({repaired} restored from the comment store)...")
+
+        tickets = (store.get(ticket_id) for ticket_id in pending_ids)
+        for done, ticket in enumerate(fetch_comments(client, tickets, comments), 1):
+            store.add(ticket)
+            if done % 500 == 0:
+                print(f"📈 {done}/{len(pending_ids)} threads fetched")
+        store.commit()
 
     print("✅ All comments fetched.")
-    tickets.save()
 
 
-def import_new_comments():
-    ticket_file = "data/all_tickets.json"
+# Re-fetches every ticket and comment thread in the dead-letter list and upserts it into the store
+def redrive_failed(workers=8):
+    ticket_file = "data/all_tickets.jsonl"
+    comment_file = "data/comments.jsonl"
     csv_file = "data/ticket_list.csv"
-    tickets = TicketData(ticket_file)
-
-    last_ticket_id = tickets.get_last_ticket_id()
-    start_appending = False
-    new_comment = {}
-    new_comments = []
-
-    with open(csv_file, "r", newline="", encoding="utf-8") as csvfile:
-        reader = csv.DictReader(csvfile)
-        for row in reader:
-            if start_appending:
-                new_comment = {
-
-                }
-                new_comments.append(new_comment)
-
-            elif int(row["Ticket ID"]) == last_ticket_id:
-                start_appending = True
-
-
-
-
-
 
-if sys.argv[1] == "import_all_tickets":
-    import_all_tickets()
-if sys.argv[1] == "import_new_tickets":
-    import_new_tickets()
-if sys.argv[1] == "import_all_comments":
-    import_all_comments()
-if sys.argv[1] == "import_new_comments":
-    import_new_comments()
+    with zendesk_client(workers) as client:
+        entries = client.scheduler.take_dead_letters()
+        if not entries:
+            print("✅ Dead-letter list is empty.")
+            return
+
+        ticket_ids = set()
+        comment_ids = set()
+        kept = []
+        for entry in entries:
+            path = entry["path"]
+            if path.startswith("/tickets/show_many.json?ids="):
+                ticket_ids.update(int(ticket_id) for ticket_id in path.split("=", 1)[1].split(","))
+                continue
+
+            match = re.fullmatch(r"/tickets/(\d+)(?:\.json)?(/comments)?(\?.*)?", path)
+            if not match:
+                # e.g. an export page url of paginate_tickets, which resumes on its own
+                print(f"⚠️ Keeping dead letter {path}, it cannot be re-driven here")
+                kept.append(entry)
+            elif match.group(2):
+                comment_ids.add(int(match.group(1)))
+            else:
+                ticket_ids.add(int(match.group(1)))
+        client.scheduler.put_back_dead_letters(kept)
+
+        store = TicketStore(ticket_file)
+
+        # tickets that never made it into the store are rebuilt from the CSV export;
+        # stored ones keep their other fields (e.g. comment_count)
+        tickets = []
+        with open(csv_file, "r", newline="", encoding="utf-8") as csvfile:
+            for row in csv.DictReader(csvfile):
+                if int(row["Ticket ID"]) in ticket_ids:
+                    ticket = {
+                        **(store.get(int(row["Ticket ID"])) or {}),
+                        "id": int(row["Ticket ID"]),
+                        "date_created": row["Ticket created - Date"],
+                        "date_solved": row["Ticket solved - Date"],
+                        "type": row["Ticket type"],
+                        "tags": [],
+                    }
+                    # tags are raw again, so let seperate_version_tags process this ticket (see ticket_record)
+                    ticket.pop("version", None)
+                    tickets.append(ticket)
+
+        # one request per ticket: the batch that failed before may hold an id that fails it again
+        for ticket in hydrate_tickets_one_by_one(client, tickets):
+            store.add(ticket)
+            print(f"✅ Saved ticket {ticket["id"]}")
+
+        commented = [ticket for ticket in store.iter_records() if ticket["id"] in comment_ids]
+        with CommentStore(comment_file) as comments:
+            store.add_many(fetch_comments(client, commented, comments))
+        store.commit()
+
+    print(f"✅ Re-drove {len(entries) - len(kept)} failed requests.")
+
+
+# Collects the ids of tickets that got a comment since start_time from the ticket event export.
+# Returns (ids, end_time) where end_time is the start_time for the next sync, or (None, start_time) on failure.
+def commented_ticket_ids(client, start_time):
+    ticket_ids = set()
+    path = f"/incremental/ticket_events.json?start_time={start_time}&include=comment_events"
+
+    while True:
+        page = client.get_json(path)
+        if page is None:
+            return None, start_time
+
+        for event in page["ticket_events"]:
+            if any(child.get("event_type") == "Comment" for child in event.get("child_events", [])):
+                ticket_ids.add(event["ticket_id"])
+
+        if page["end_of_stream"]:
+            return ticket_ids, page["end_time"]
+        path = page["next_page"]
+
+
+# Re-fetches the threads of tickets commented on since the last sync and upserts them by id.
+# The first run has no start time yet, so it fetches every ticket that has no thread in the comment store.
+def import_new_comments(workers=8):
+    ticket_file = "data/all_tickets.jsonl"
+    comment_file = "data/comments.jsonl"
+    store = TicketStore(ticket_file)
+
+    with zendesk_client(workers) as client, CommentStore(comment_file) as comments:
+        start_time = store.state.get("comment_start_time")
+        if start_time is None:
+            end_time = int(time.time())
+            changed_ids = {ticket["id"] for ticket in store.iter_records() if ticket["id"] not in comments}
+        else:
+            changed_ids, end_time = commented_ticket_ids(client, start_time)
+            if changed_ids is None:
+                print("❌ Ticket event export failed, nothing was changed.")
+                return
+
+        tickets = [store.get(ticket_id) for ticket_id in sorted(changed_ids) if ticket_id in store]
+
+        # failed threads are dead-lettered and can be picked up with redrive_failed
+        store.add_many(fetch_comments(client, tickets, comments))
+        store.commit(state={**store.state, "comment_start_time": end_time})
+
+    print(f"✅ Comments fetched for {len(tickets)} tickets.")
+
+
+# python zendesk_import.py <command> [workers], see cli.py
+if __name__ == "__main__":
+    from cli import main
+    main(sys.argv[1:])